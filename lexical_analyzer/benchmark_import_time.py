@@ -0,0 +1,58 @@
+"""
+Import-time benchmark for the core modules.
+
+Every measurement runs in a fresh interpreter (so nothing is cached in sys.modules) and reports the
+median wall time over a few runs, next to the cost of importing the plotting stack itself.
+It also checks that importing the core never drags in the plotting libraries.
+
+    python benchmark_import_time.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CORE_MODULES = ["regex_preprocessor", "nfa", "dfa", "minimized_dfa", "utils", "lexer", "tagged_dfa"]
+HEAVY_MODULES = ["networkx", "matplotlib", "PIL", "pygraphviz"]
+
+CASES = {
+    "python (baseline)": "pass",
+    "core": "import " + ", ".join(CORE_MODULES),
+    "visualization (lazy)": "import visualization",
+    "networkx + pygraphviz": "import networkx; from networkx.drawing import nx_agraph; import pygraphviz",
+}
+
+
+def time_import(statement: str, runs: int):
+    """Median wall time in ms of `python -c statement`, None if the statement fails (missing package)."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", statement], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True)
+        if result.returncode != 0:
+            return None
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def heavy_modules_loaded_by_core() -> list[str]:
+    check = "import sys; import {}; print(','.join(m for m in {!r} if m in sys.modules))".format(
+        ", ".join(CORE_MODULES), HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", check], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    results = {name: time_import(statement, runs) for name, statement in CASES.items()}
+    for name, ms in results.items():
+        print(f"{name:<24} {'not installed' if ms is None else f'{ms:8.1f} ms'}")
+
+    leaked = heavy_modules_loaded_by_core()
+    print(json.dumps({"runs": runs, "median_ms": results, "heavy_modules_loaded_by_core": leaked}))
+    assert not leaked, f"Core modules imported plotting libraries: {leaked}"
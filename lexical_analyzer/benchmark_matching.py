@@ -0,0 +1,324 @@
+"""
+Match-throughput benchmark and differential check against python's re.
+
+For every pattern (test_cases.regex_list by default) a synthetic corpus is generated from the pattern's
+AST: positive samples by a random walk over the tree, negative samples by mutating them. Every matching
+backend then runs over the same corpus:
+
+    re.fullmatch / re.match     the reference, the pattern translated to python syntax
+    lexer                       Lexer with a single rule, fullmatch <=> longest match covers the text
+    minimized_dfa               MinimizedDFA walked edge by edge (edges of a state never overlap)
+    tagged_dfa.fullmatch/match  TaggedDFA, spans of every group
+
+Throughput (MB/s of UTF-8 input) and mean latency (us per match) are the best of a few runs after one
+warm up run (TaggedDFA builds its tables lazily), latency percentiles come from one more run timing every
+match on its own. Results are compared with re: accept/reject for
+every backend, group spans for TaggedDFA and the match end of the lexer (longest accepted prefix).
+A backend that fails to compile a pattern is reported for that pattern and the run goes on.
+The last output line is JSON, the exit code is 1 if any backend disagrees with re or fails.
+
+With --input-bytes N the positive samples are long texts instead: their * + {m,} repeats run longer until
+a sample has about N bytes (patterns without unbounded repeats keep short samples). re can backtrack a
+lot on long mutated inputs, so use fewer --samples.
+
+    python benchmark_matching.py [--samples N] [--max-repeat N] [--input-bytes N] [--runs N] [--seed N]
+                                 [--output FILE] [REGEX ...]
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+import regex_ast
+from regex_preprocessor import symbol_bounds
+from nfa import NFA
+from dfa import CharClassDFA
+from minimized_dfa import MinimizedDFA
+from lexer import Lexer, ERROR
+from tagged_dfa import TaggedDFA
+
+ALPHABET = [chr(code) for code in range(32, 127)] + ["\n", "é", "λ", "€"]
+MAX_EXAMPLES = 5    # mismatching inputs kept per backend
+
+
+# --- translation to python's re -----------------------------------------------------------------------
+
+def _re_symbol(symbol: str) -> str:
+    if symbol == ".": return "(?s:.)"
+    if len(symbol) == 3: return f"[{re.escape(symbol[0])}-{re.escape(symbol[2])}]"
+    return re.escape(symbol)
+
+
+def to_python_regex(node) -> str:
+    """Translate an (unsimplified) AST to python syntax keeping group numbers: '.' matches anything."""
+    if isinstance(node, regex_ast.Empty): return "(?:)"
+    if isinstance(node, regex_ast.Symbol): return _re_symbol(node.symbol)
+    if isinstance(node, regex_ast.CharClass):
+        if "." in node.symbols: return "(?s:.)"
+        return "[" + "".join(f"{re.escape(s[0])}-{re.escape(s[2])}" if len(s) == 3 else re.escape(s)
+                             for s in node.symbols) + "]"
+    if isinstance(node, regex_ast.Group): return "(" + to_python_regex(node.node) + ")"
+    if isinstance(node, regex_ast.Alternation): return "|".join(to_python_regex(option) for option in node.options)
+    if isinstance(node, regex_ast.Concat):
+        return "".join(f"(?:{to_python_regex(part)})" if isinstance(part, regex_ast.Alternation)
+                       else to_python_regex(part) for part in node.parts)
+    if isinstance(node, regex_ast.Repeat):
+        inner = to_python_regex(node.node)
+        if not isinstance(node.node, (regex_ast.Symbol, regex_ast.Group)) or inner == "(?s:.)":
+            inner = f"(?:{inner})"
+        return inner + f"{{{node.min},{'' if node.max is regex_ast.INF else node.max}}}"
+    raise TypeError(f"Not a regex node: {node!r}")
+
+
+# --- corpus ---------------------------------------------------------------------------------------------
+
+def _random_char(symbol: str, rng: random.Random) -> str:
+    bounds = symbol_bounds(symbol)
+    if bounds is None: return rng.choice(ALPHABET)
+    return chr(rng.randint(*bounds))
+
+
+def generate(node, rng: random.Random, max_repeat: int) -> str:
+    """A random string matching node (repeats run at most max_repeat times past their minimum)."""
+    if isinstance(node, regex_ast.Empty): return ""
+    if isinstance(node, regex_ast.Symbol): return _random_char(node.symbol, rng)
+    if isinstance(node, regex_ast.CharClass): return _random_char(rng.choice(node.symbols), rng)
+    if isinstance(node, regex_ast.Group): return generate(node.node, rng, max_repeat)
+    if isinstance(node, regex_ast.Alternation): return generate(rng.choice(node.options), rng, max_repeat)
+    if isinstance(node, regex_ast.Concat): return "".join(generate(part, rng, max_repeat) for part in node.parts)
+    if isinstance(node, regex_ast.Repeat):
+        high = node.min + max_repeat if node.max is regex_ast.INF else min(node.max, node.min + max_repeat)
+        return "".join(generate(node.node, rng, max_repeat) for _ in range(rng.randint(node.min, high)))
+    raise TypeError(f"Not a regex node: {node!r}")
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """Insert, delete or replace one character, or append a random suffix."""
+    i = rng.randint(0, len(text))
+    choice = rng.randrange(4)
+    if choice == 0: return text[:i] + rng.choice(ALPHABET) + text[i:]
+    if choice == 1 and text: return text[:i] + text[i + 1:]
+    if choice == 2 and i < len(text): return text[:i] + rng.choice(ALPHABET) + text[i + 1:]
+    return text + "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 3)))
+
+
+def long_text(node, input_bytes: int, max_repeat: int, rng: random.Random) -> str:
+    """A sample of node with at least input_bytes bytes, doubling max_repeat until it gets there (or gives up)."""
+    text = generate(node, rng, max_repeat)
+    while len(text.encode("utf-8")) < input_bytes and max_repeat < 4 * input_bytes:
+        max_repeat = max(1, 2 * max_repeat)
+        text = generate(node, rng, max_repeat)
+    return text
+
+
+def build_corpus(node, samples: int, max_repeat: int, rng: random.Random, input_bytes: int = 0) -> list[str]:
+    """Half positive samples (long texts with input_bytes), half mutations of positive samples (mostly negative)."""
+    if input_bytes:
+        positives = [long_text(node, input_bytes, max_repeat, rng) for _ in range((samples + 1) // 2)]
+    else:
+        positives = [generate(node, rng, max_repeat) for _ in range((samples + 1) // 2)]
+    return positives + [mutate(rng.choice(positives), rng) for _ in range(samples // 2)]
+
+
+# --- backends -------------------------------------------------------------------------------------------
+
+def minimized_dfa_matcher(regex: str):
+    minimized_dfa = MinimizedDFA(CharClassDFA(NFA().build_nfa(regex)))
+    for state, transitions in minimized_dfa.minimized_transitions.items():
+        if CharClassDFA._overlapping(transitions):
+            raise ValueError(f"Minimized DFA of {regex!r} is not deterministic: {state} {sorted(transitions)}")
+    edges = {state: [(symbol_bounds(symbol), target) for symbol, target in transitions.items()]
+             for state, transitions in minimized_dfa.minimized_transitions.items()}
+
+    def fullmatch(text: str) -> bool:
+        state = minimized_dfa.start_state
+        for char in text:
+            code = ord(char)
+            for bounds, target in edges[state]:
+                if bounds is None or bounds[0] <= code <= bounds[1]:
+                    state = target
+                    break
+            else:
+                return False
+        return state in minimized_dfa.accept_states
+    return fullmatch
+
+
+def lexer_matcher(regex: str):
+    lexer = Lexer([("MATCH", regex)])
+
+    def longest_match(text: str):
+        """End of the longest matching prefix, None if no prefix (not even the empty one) matches."""
+        token = lexer._scan(text, 0) if text else None
+        if token is not None and token.kind != ERROR: return token.end
+        return 0 if lexer.accepting and lexer.accepting[0] is not None else None
+    return longest_match
+
+
+def backends(regex: str, python_regex: str) -> dict:
+    """name -> (compile function, match function of (compiled, text)), the result is what gets compared."""
+    return {
+        "re.fullmatch": (lambda: re.compile(python_regex),
+                         lambda pattern, text: pattern.fullmatch(text) is not None),
+        "re.match": (lambda: re.compile(python_regex),
+                     lambda pattern, text: pattern.match(text) is not None),
+        "lexer": (lambda: lexer_matcher(regex),
+                  lambda longest_match, text: longest_match(text) == len(text)),
+        "minimized_dfa": (lambda: minimized_dfa_matcher(regex),
+                          lambda fullmatch, text: fullmatch(text)),
+        "tagged_dfa.fullmatch": (lambda: TaggedDFA(regex),
+                                 lambda tagged_dfa, text: tagged_dfa.fullmatch(text) is not None),
+        "tagged_dfa.match": (lambda: TaggedDFA(regex),
+                             lambda tagged_dfa, text: tagged_dfa.match(text) is not None),
+    }
+
+
+def _python_spans(match) -> list:
+    if match is None: return None
+    return [None if match.start(group) == -1 else (match.start(group), match.end(group))
+            for group in range(match.re.groups + 1)]
+
+
+def _longest_prefix(pattern, text: str):
+    return next((end for end in range(len(text), -1, -1) if pattern.fullmatch(text, 0, end)), None)
+
+
+def differences(pattern, compiled: dict, corpus: list[str]) -> dict:
+    """Backend -> [(text, expected, got), ...] for every input where it disagrees with re (compiled backends only)."""
+    mismatches = {name: [] for name in compiled}
+
+    def check(name, text, expected, got):
+        if expected != got: mismatches[name].append((text, expected, got))
+
+    for text in corpus:
+        full, anchored = pattern.fullmatch(text), pattern.match(text)
+        if "lexer" in compiled:
+            longest_match = compiled["lexer"](text)
+            check("lexer", text, full is not None, longest_match == len(text))
+            if len(text) <= 64:     # quadratic reference, short inputs only
+                check("lexer", text, _longest_prefix(pattern, text), longest_match)
+        if "minimized_dfa" in compiled:
+            check("minimized_dfa", text, full is not None, compiled["minimized_dfa"](text))
+        if "tagged_dfa.fullmatch" in compiled:
+            check("tagged_dfa.fullmatch", text, _python_spans(full), compiled["tagged_dfa.fullmatch"].fullmatch(text))
+        if "tagged_dfa.match" in compiled:
+            check("tagged_dfa.match", text, _python_spans(anchored), compiled["tagged_dfa.match"].match(text))
+    return {name: found for name, found in mismatches.items() if found}
+
+
+# --- benchmark ------------------------------------------------------------------------------------------
+
+def percentiles(latencies: list[float]) -> dict:
+    """p50/p90/p99 of latencies (seconds) in us."""
+    latencies = sorted(latencies)
+    return {f"p{p}": round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1e6, 3)
+            for p in (50, 90, 99)}
+
+
+def time_backend(compile_function, match_function, corpus: list[str], runs: int) -> tuple:
+    """(compile seconds, best run seconds, latency of every match, accepted count, compiled), after one untimed warm up run."""
+    start = time.perf_counter()
+    compiled = compile_function()
+    compile_seconds = time.perf_counter() - start
+
+    accepted = sum(1 for text in corpus if match_function(compiled, text))
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for text in corpus:
+            match_function(compiled, text)
+        best = min(best, time.perf_counter() - start)
+
+    latencies = []
+    for text in corpus:
+        start = time.perf_counter()
+        match_function(compiled, text)
+        latencies.append(time.perf_counter() - start)
+    return compile_seconds, best, latencies, accepted, compiled
+
+
+def benchmark_pattern(regex: str, samples: int, max_repeat: int, runs: int, rng: random.Random,
+                      input_bytes: int = 0) -> dict:
+    node = regex_ast.parse(regex)
+    python_regex = to_python_regex(node)
+    corpus = build_corpus(node, samples, max_repeat, rng, input_bytes)
+    size = sum(len(text.encode("utf-8")) for text in corpus)
+
+    results, compiled, failures = {}, {}, {}
+    for name, (compile_function, match_function) in backends(regex, python_regex).items():
+        try:
+            compile_seconds, seconds, latencies, accepted, compiled[name] = time_backend(
+                compile_function, match_function, corpus, runs)
+        except Exception as error:      # one backend failing on one pattern must not abort the run
+            failures[name] = f"{type(error).__name__}: {error}"
+            results[name] = {"error": failures[name]}
+            continue
+        results[name] = {
+            "compile_ms": round(compile_seconds * 1000, 3),
+            "mb_per_s": round(size / seconds / 1e6, 3) if seconds else None,
+            "us_per_match": round(seconds / len(corpus) * 1e6, 3),
+            "latency_us": percentiles(latencies),
+            "accepted": accepted,
+        }
+
+    mismatches = differences(re.compile(python_regex), compiled, corpus)
+    mismatch_report = {name: {"count": len(found), "examples": [list(example) for example in found[:MAX_EXAMPLES]]}
+                       for name, found in mismatches.items()}
+    mismatch_report.update((name, {"error": error}) for name, error in failures.items())
+    return {
+        "regex": regex,
+        "python_regex": python_regex,
+        "samples": len(corpus),
+        "bytes": size,
+        "accepted": sum(1 for text in corpus if compiled["re.fullmatch"].fullmatch(text)),
+        "backends": results,
+        "mismatches": mismatch_report,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the matching backends against python's re.")
+    parser.add_argument("regexes", nargs="*", help="patterns to benchmark (default: test_cases.regex_list)")
+    parser.add_argument("--samples", type=int, default=2000, help="inputs per pattern")
+    parser.add_argument("--max-repeat", type=int, default=20, help="extra iterations of * + {m,} in generated inputs")
+    parser.add_argument("--input-bytes", type=int, default=0,
+                        help="grow positive samples to about this many bytes (use fewer --samples)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if not args.regexes:
+        from test_cases import regex_list
+        args.regexes = regex_list
+
+    rng = random.Random(args.seed)
+    report = {
+        "python": sys.version.split()[0],
+        "seed": args.seed,
+        "samples": args.samples,
+        "max_repeat": args.max_repeat,
+        "input_bytes": args.input_bytes,
+        "runs": args.runs,
+        "patterns": [],
+    }
+    for regex in args.regexes:
+        result = benchmark_pattern(regex, args.samples, args.max_repeat, args.runs, rng, args.input_bytes)
+        report["patterns"].append(result)
+        print(f"{regex:<50} {result['bytes'] / 1e6:8.3f} MB  accepted {result['accepted']}/{result['samples']}")
+        for name, backend in result["backends"].items():
+            if "error" in backend:
+                print(f"    {name:<22} FAILED {backend['error']}")
+                continue
+            status = f"  MISMATCH x{result['mismatches'][name]['count']}" if name in result["mismatches"] else ""
+            latency = backend["latency_us"]
+            print(f"    {name:<22} {backend['mb_per_s']:9.3f} MB/s {backend['us_per_match']:11.3f} us/match"
+                  f"  p50 {latency['p50']:11.3f}  p90 {latency['p90']:11.3f}  p99 {latency['p99']:11.3f} us{status}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=4, ensure_ascii=False)
+    print(json.dumps(report, ensure_ascii=False))
+    sys.exit(1 if any(result["mismatches"] for result in report["patterns"]) else 0)
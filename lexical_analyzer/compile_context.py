@@ -0,0 +1,142 @@
+"""
+Compilation context shared by many regexes (a whole rule set).
+
+- every simplified AST is hash-consed: structurally identical sub-expressions across all regexes
+  are the same node object, so the rule set is stored as a DAG instead of one tree per regex
+- a sub-expression used more than once is determinized and minimized once (a "fragment"), every
+  use copies that small automaton instead of re-running Thompson's construction on it
+- all NFAs are built with one state counter, so state names are unique across the rule set
+- whole-regex minimized DFAs are cached as well
+
+Capture groups are not kept (fragments have no tags), use TaggedDFA for submatches.
+"""
+from collections import Counter
+from dataclasses import replace
+from typing import NamedTuple
+
+import regex_ast
+from nfa import NFA
+from dfa import DFA, CharClassDFA
+from minimized_dfa import MinimizedDFA
+
+SHAREABLE = (regex_ast.Concat, regex_ast.Alternation, regex_ast.Repeat)
+
+
+class Fragment(NamedTuple):
+    transitions: dict       # minimized DFA: {state: {symbol: next state}}
+    start_state: str
+    accept_states: frozenset
+
+
+class CompilationContext:
+    def __init__(self):
+        self.builder = NFA()
+        self.nodes: dict = {}                   # shallow key -> interned node
+        self.uses: Counter = Counter()          # id(interned node) -> number of occurrences in all regexes
+        self.regexes: dict = {}                 # regex -> interned simplified AST
+        self.fragments: dict = {}               # id(interned node) -> Fragment
+        self.minimized_dfas: dict = {}          # id(interned node) -> MinimizedDFA
+        self.fragment_uses = 0
+
+    def intern(self, node):
+        """
+        Return the canonical instance of node.
+        Children are interned first, so a node is identified by its own fields and the ids of its
+        (canonical) children: no deep hashing or comparison is ever needed.
+        """
+        if isinstance(node, regex_ast.Concat):
+            parts = tuple(self.intern(part) for part in node.parts)
+            key, node = ("Concat", tuple(map(id, parts))), regex_ast.Concat(parts, node.pos)
+        elif isinstance(node, regex_ast.Alternation):
+            options = tuple(self.intern(option) for option in node.options)
+            key, node = ("Alternation", tuple(map(id, options))), regex_ast.Alternation(options, node.pos)
+        elif isinstance(node, regex_ast.Repeat):
+            inner = self.intern(node.node)
+            key, node = ("Repeat", id(inner), node.min, node.max), replace(node, node=inner)
+        elif isinstance(node, regex_ast.Group):
+            inner = self.intern(node.node)
+            key, node = ("Group", id(inner), node.index), replace(node, node=inner)
+        else:
+            key = (type(node).__name__, getattr(node, "symbol", None), getattr(node, "symbols", None))
+
+        node = self.nodes.setdefault(key, node)
+        self.uses[id(node)] += 1
+        return node
+
+    def add(self, regex: str):
+        """Parse, simplify and intern a regex, counting the uses of its sub-expressions (once per regex)."""
+        if regex in self.regexes:
+            return self.regexes[regex]
+        node = self.intern(regex_ast.simplify(regex_ast.parse(regex)))
+        self.regexes[regex] = node
+        return node
+
+    def fragment(self, node) -> Fragment:
+        if id(node) not in self.fragments:
+            minimized_dfa = MinimizedDFA(DFA(NFA().build_nfa_from_ast(node)))
+            self.fragments[id(node)] = Fragment(minimized_dfa.minimized_transitions, minimized_dfa.start_state,
+                                                frozenset(minimized_dfa.accept_states))
+        return self.fragments[id(node)]
+
+    def _shared_fragments(self, node, found: dict):
+        """Map the outermost shared sub-trees of node (by id) to their fragments."""
+        if isinstance(node, SHAREABLE) and self.uses[id(node)] > 1:
+            found[id(node)] = self.fragment(node)
+            self.fragment_uses += 1
+            return found
+        for child in getattr(node, "parts", ()) + getattr(node, "options", ()):
+            self._shared_fragments(child, found)
+        if isinstance(node, (regex_ast.Repeat, regex_ast.Group)):
+            self._shared_fragments(node.node, found)
+        return found
+
+    def build_nfa(self, regex: str) -> NFA:
+        """
+        Build the NFA of regex, instantiating shared sub-expressions from their fragments.
+        Add every regex of the rule set first so sharing is known before anything is built.
+        """
+        node = self.add(regex)
+        return self.builder.build_nfa_from_ast(node, self._shared_fragments(node, {}))
+
+    def minimized_dfa(self, regex: str) -> MinimizedDFA:
+        node = self.add(regex)
+        if id(node) not in self.minimized_dfas:
+            self.minimized_dfas[id(node)] = MinimizedDFA(CharClassDFA(self.build_nfa(regex)))
+        return self.minimized_dfas[id(node)]
+
+    def stats(self) -> dict:
+        return {
+            "regexes": len(self.regexes),
+            "interned_nodes": len(self.nodes),
+            "node_occurrences": sum(self.uses.values()),
+            "fragments": len(self.fragments),
+            "fragment_uses": self.fragment_uses,
+            "nfa_states": self.builder.state_counter,
+        }
+
+
+if __name__ == "__main__":
+    from test_cases import regex_list
+
+    context = CompilationContext()
+    for regex in regex_list:
+        context.add(regex)
+
+    first, second = context.add("[a-zA-Z]+x"), context.add("y[a-zA-Z]+")
+    assert first.parts[0] is second.parts[1], "identical sub-expressions should be the same object"
+
+    for regex in regex_list:
+        context.build_nfa(regex)
+    print(context.stats())
+    assert context.stats()["fragments"] > 0
+
+    # adding a regex again must not count its sub-expressions twice
+    from lexer import Lexer
+    unrelated = CompilationContext()
+    for regex in ("[a-z]+", "[0-9]+"):
+        unrelated.add(regex)
+    Lexer([("ID", "[a-z]+"), ("NUM", "[0-9]+")], context=unrelated)
+    assert unrelated.stats()["fragments"] == 0, unrelated.stats()
+    assert context.minimized_dfa("a|b") is context.minimized_dfa("b|a|a")
+    assert not any(CharClassDFA._overlapping(edges) for edges in context.minimized_dfa("(a|b)*abb").minimized_transitions.values())
+    print("All tests passed!")
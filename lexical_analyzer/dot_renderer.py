@@ -0,0 +1,243 @@
+"""
+Render automata by writing DOT text directly (no networkx / pygraphviz).
+
+- parallel edges between two states are merged into one edge labelled with a char class ("a-z,0-9")
+- strongly connected components bigger than collapse_threshold become a single node
+- with max_nodes only the states closest to the start state are drawn, the rest is summarized
+- graphs with more than sfdp_threshold nodes are laid out with sfdp instead of dot
+- render_batch renders any number of graphs with one graphviz process per output format
+"""
+import os
+import subprocess
+import tempfile
+from collections import defaultdict, deque
+
+from regex_preprocessor import symbol_bounds
+
+START_NODE = "__start__"
+MORE_NODE = "__more__"
+
+
+def _char_label(code: int) -> str:
+    char = chr(code)
+    return char if char.isprintable() and char not in ",- " else f"U+{code:04X}"
+
+
+def merge_labels(symbols) -> str:
+    """Merge the edge symbols between two states into one label, e.g. ["b", "a", "c", "0-9"] -> "0-9,a-c"."""
+    parts, ranges = [], []
+    if "ε" in symbols: parts.append("ε")
+    if "." in symbols:
+        parts.append(".")   # matches anything, the other symbols add nothing
+    else:
+        for symbol in symbols:
+            if symbol != "ε": ranges.append(symbol_bounds(symbol))
+
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    for lo, hi in merged:
+        if lo == hi: parts.append(_char_label(lo))
+        elif hi == lo + 1: parts.extend([_char_label(lo), _char_label(hi)])
+        else: parts.append(f"{_char_label(lo)}-{_char_label(hi)}")
+    return ",".join(parts)
+
+
+def _quote(text: str) -> str:
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _edges(transitions) -> dict:
+    """(source, target) -> symbols, for both NFA-style (list of targets) and DFA-style transitions."""
+    edges = defaultdict(list)
+    for state, state_transitions in transitions.items():
+        for symbol, next_states in state_transitions.items():
+            for next_state in (next_states if isinstance(next_states, list) else [next_states]):
+                edges[(state, next_state)].append(symbol)
+    return edges
+
+
+def _strongly_connected_components(states, successors) -> list[list]:
+    """Iterative Tarjan's algorithm."""
+    index, low, on_stack, stack, components = {}, {}, set(), [], []
+    for root in states:
+        if root in index: continue
+        work = [(root, iter(successors[root]))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            state, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors[child])))
+                elif child in on_stack:
+                    low[state] = min(low[state], index[child])
+                continue
+
+            work.pop()
+            if work: low[work[-1][0]] = min(low[work[-1][0]], low[state])
+            if low[state] == index[state]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == state: break
+                components.append(component)
+    return components
+
+
+def fsm_to_dot(transitions, start_state, accept_states, name="fsm",
+               collapse_threshold=None, max_nodes=None, sfdp_threshold=200) -> str:
+    """
+    Convert a finite state machine to DOT text.
+    :param transitions: state -> {symbol: next state or [next states]} (same shape plot_fsm takes).
+    :param collapse_threshold: collapse strongly connected components with more states than this.
+    :param max_nodes: only draw the max_nodes states closest to the start state.
+    :param sfdp_threshold: use the sfdp layout above this many nodes.
+    """
+    edges = _edges(transitions)
+    states = list(dict.fromkeys(list(transitions.keys()) + [target for (_, target) in edges]))
+
+    # Step 1: collapse big strongly connected components into one node
+    node_of, collapsed = {state: state for state in states}, set()
+    node_labels, node_accepting = {state: state for state in states}, {state: state in accept_states for state in states}
+    if collapse_threshold is not None:
+        successors = defaultdict(list)
+        for (source, target) in edges: successors[source].append(target)
+        for number, component in enumerate(_strongly_connected_components(states, successors)):
+            if len(component) <= collapse_threshold: continue
+            node = f"__component{number}__"
+            collapsed.add(node)
+            for state in component: node_of[state] = node
+            node_labels[node] = f"{len(component)} states"
+            node_accepting[node] = any(state in accept_states for state in component)
+
+    merged_edges = defaultdict(set)
+    for (source, target), symbols in edges.items():
+        merged_edges[(node_of[source], node_of[target])].update(symbols)
+    nodes = list(dict.fromkeys(node_of.values()))
+
+    # Step 2: keep the max_nodes nodes closest to the start state
+    hidden = 0
+    if max_nodes is not None and len(nodes) > max_nodes:
+        successors = defaultdict(list)
+        for (source, target) in merged_edges: successors[source].append(target)
+        kept, queue = {node_of[start_state]}, deque([node_of[start_state]])
+        while queue and len(kept) < max_nodes:
+            for target in successors[queue.popleft()]:
+                if target not in kept and len(kept) < max_nodes:
+                    kept.add(target)
+                    queue.append(target)
+        hidden = len(nodes) - len(kept)
+        nodes = [node for node in nodes if node in kept]
+
+        truncated = defaultdict(set)
+        for (source, target), symbols in merged_edges.items():
+            if source in kept and target in kept: truncated[(source, target)] = symbols
+            elif source in kept: truncated[(source, MORE_NODE)].update(symbols)
+        merged_edges = truncated
+
+    # Step 3: write the DOT text
+    large = len(nodes) > sfdp_threshold
+    lines = [f"digraph {_quote(name)} {{"]
+    lines.append('  graph [layout=sfdp, overlap=prism, splines=true];' if large else '  graph [layout=dot, rankdir=LR];')
+    lines.append(f'  {START_NODE} [shape=none, label=""];')
+    for node in nodes:
+        attributes = [f"shape={'box' if node in collapsed else 'circle'}", f"label={_quote(node_labels[node])}"]
+        if node_accepting[node]: attributes.append("peripheries=2")
+        lines.append(f"  {_quote(node)} [{', '.join(attributes)}];")
+    if hidden:
+        lines.append(f'  {MORE_NODE} [shape=plaintext, label="... {hidden} more states"];')
+
+    lines.append(f"  {START_NODE} -> {_quote(node_of[start_state])};")
+    for (source, target), symbols in merged_edges.items():
+        style = ", style=dashed" if target == MORE_NODE else ""
+        target_id = target if target == MORE_NODE else _quote(target)
+        lines.append(f"  {_quote(source)} -> {target_id} [label={_quote(merge_labels(symbols))}{style}];")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def nfa_to_dot(nfa, **options) -> str:
+    data = nfa.to_dict()
+    start_state = data.pop("startingState")
+    accept_states = {state for state, entry in data.items() if entry["isTerminatingState"]}
+    transitions = {state: {symbol: targets for symbol, targets in entry.items() if symbol != "isTerminatingState"}
+                   for state, entry in data.items()}
+    return fsm_to_dot(transitions, start_state, accept_states, name="nfa", **options)
+
+
+def dfa_to_dot(dfa, **options) -> str:
+    return fsm_to_dot(dfa.transitions, dfa.start_state, dfa.accept_states, name="dfa", **options)
+
+
+def minimized_dfa_to_dot(minimized_dfa, **options) -> str:
+    return fsm_to_dot(minimized_dfa.minimized_transitions, minimized_dfa.start_state, minimized_dfa.accept_states,
+                      name="minimized_dfa", **options)
+
+
+def save_dot(dot_text: str, file_name: str, output_folder: str):
+    """
+    Save DOT text to a file.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, file_name), "w", encoding="utf-8") as dot_file:
+        dot_file.write(dot_text)
+
+
+def render_batch(jobs: list[tuple[str, str]], graphviz: str = "dot"):
+    """
+    Render [(dot text, output path), ...] with a single graphviz process per output format.
+    The format comes from the output path extension (png, svg, pdf, ...), the layout engine
+    from the graph's own "layout" attribute.
+    """
+    by_format = defaultdict(list)
+    for dot_text, path in jobs:
+        by_format[os.path.splitext(path)[1].lstrip(".").lower() or "png"].append((dot_text, path))
+
+    for fmt, fmt_jobs in by_format.items():
+        with tempfile.TemporaryDirectory() as folder:
+            inputs = []
+            for number, (dot_text, _) in enumerate(fmt_jobs):
+                inputs.append(os.path.join(folder, f"graph{number}"))
+                with open(inputs[-1], "w", encoding="utf-8") as dot_file:
+                    dot_file.write(dot_text)
+
+            # -O names each output "<input>.<format>"
+            subprocess.run([graphviz, f"-T{fmt}", "-O", *inputs], check=True)
+
+            for input_path, (_, path) in zip(inputs, fmt_jobs):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                os.replace(f"{input_path}.{fmt}", path)
+
+
+def render_dot(dot_text: str, path: str, graphviz: str = "dot"):
+    render_batch([(dot_text, path)], graphviz)
+
+
+if __name__ == "__main__":
+    assert merge_labels(["b", "a", "c", "0-9"]) == "0-9,a-c"
+    assert merge_labels(["a-z", "A-Z", "b", "ε"]) == "ε,A-Z,a-z"
+    assert merge_labels(["x", "y", "."]) == "."
+    assert merge_labels(["a", "b"]) == "a,b"
+
+    transitions = {"S1": {"a": "S2", "b": "S2", "c": "S1"}, "S2": {"a-z": "S1"}, "S3": {}}
+    dot = fsm_to_dot(transitions, "S1", {"S2"})
+    print(dot)
+    assert '"S1" -> "S2" [label="a,b"];' in dot and "layout=dot" in dot
+
+    dot = fsm_to_dot(transitions, "S1", {"S2"}, collapse_threshold=1)
+    assert "2 states" in dot and "peripheries=2" in dot
+
+    dot = fsm_to_dot(transitions, "S1", {"S2"}, max_nodes=1, sfdp_threshold=0)
+    assert "2 more states" in dot and "layout=sfdp" in dot
+    print("All tests passed!")
@@ -1,8 +1,9 @@
 import os
 import json
-from nfa import NFA, plot_nfa, save_nfa_to_json
-from dfa import DFA, plot_dfa,save_dfa_to_json
-from minimized_dfa import MinimizedDFA, plot_minimized_dfa, save_minimized_dfa_to_json
+from nfa import NFA, save_nfa_to_json
+from dfa import DFA, save_dfa_to_json
+from minimized_dfa import MinimizedDFA, save_minimized_dfa_to_json
+from dot_renderer import nfa_to_dot, dfa_to_dot, minimized_dfa_to_dot, render_batch
 from test_cases import regex_list
 
 if __name__ == "__main__":
@@ -10,6 +11,9 @@ if __name__ == "__main__":
     # Generate folder names by replacing *, |, and ? with _
     folder_names = [regex.replace("*", "_").replace("|", "_").replace("?", "_") for regex in regex_list]
 
+    # All images are rendered at the end by a single graphviz process
+    render_jobs = []
+
     for regex, folder_name in zip(regex_list, folder_names):
         # Create output folder for each regex
         output_folder = os.path.join(os.getcwd(), "output", folder_name)
@@ -19,11 +23,13 @@ if __name__ == "__main__":
         dfa = DFA(nfa)
         minimized_dfa = MinimizedDFA(dfa)
 
-        plot_nfa(nfa, "nfa.png", output_folder)
+        render_jobs.append((nfa_to_dot(nfa), os.path.join(output_folder, "nfa.png")))
         save_nfa_to_json(nfa, "nfa.json", output_folder)
 
-        plot_dfa(dfa, "dfa.png", output_folder)
+        render_jobs.append((dfa_to_dot(dfa), os.path.join(output_folder, "dfa.png")))
         save_dfa_to_json(dfa, "dfa.json", output_folder)
 
-        plot_minimized_dfa(minimized_dfa,  output_folder)
+        render_jobs.append((minimized_dfa_to_dot(minimized_dfa), os.path.join(output_folder, "minimized_dfa.png")))
         save_minimized_dfa_to_json(minimized_dfa, "minimized_dfa.json", output_folder)
+
+    render_batch(render_jobs)
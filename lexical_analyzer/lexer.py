@@ -0,0 +1,373 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, NamedTuple, Optional
+from bisect import bisect_right
+from collections import deque
+import json, os
+
+from nfa import NFA, State
+from regex_preprocessor import symbol_bounds
+
+ERROR = "ERROR"             # kind of the one-character token emitted when no rule matches
+
+
+class Token(NamedTuple):
+    kind: str
+    lexeme: str
+    start: int
+    end: int
+    scan_end: int   # one past the furthest position the DFA looked at (len(text) + 1 if it hit EOF)
+
+    def shifted(self, delta: int) -> Token:
+        return self._replace(start=self.start + delta, end=self.end + delta, scan_end=self.scan_end + delta)
+
+
+def build_char_classes(symbols) -> list[int]:
+    """
+    Split the code point space into disjoint classes so that every symbol is a union of classes.
+    The returned cut points are sorted: class i covers [cuts[i-1], cuts[i]) with 0 and 0x110000 as sentinels.
+    """
+    cuts = set()
+    for symbol in symbols:
+        bounds = symbol_bounds(symbol)
+        if bounds is None: continue
+        cuts.add(bounds[0])
+        cuts.add(bounds[1] + 1)
+    return sorted(cuts)
+
+
+def class_symbols(cuts: list[int], symbols) -> list[list[str]]:
+    """For every char class, list the edge symbols that match it."""
+    lower_bounds = [0] + cuts
+    matching = [[] for _ in range(len(cuts) + 1)]
+    for symbol in symbols:
+        bounds = symbol_bounds(symbol)
+        for cls, lo in enumerate(lower_bounds):
+            if bounds is None or bounds[0] <= lo <= bounds[1]:
+                matching[cls].append(symbol)
+    return matching
+
+
+def epsilon_closure(states) -> frozenset:
+    closure = set(states)
+    stack = list(states)
+    while stack:
+        state = stack.pop()
+        for next_state in state.transitions.get("ε", []):
+            if next_state not in closure:
+                closure.add(next_state)
+                stack.append(next_state)
+    return frozenset(closure)
+
+
+class TokenStream:
+    """
+    The tokens of a text, stored in chunks so an edit costs about one chunk instead of the whole tail.
+
+    Every chunk is [shift, tokens, reach]: its tokens keep the positions they were lexed at and are
+    moved by shift, so the tokens after an edit are moved by updating one number per chunk.
+    max_reach[k] is the furthest any scan of chunks 0..k looked (a running maximum of scan_end),
+    which lets relex find the first token an edit can affect with a bisect.
+    """
+    CHUNK_SIZE = 512
+
+    def __init__(self, tokens: Iterable[Token] = ()):
+        self.chunks: list[list] = self._make_chunks(list(tokens))
+        self.max_reach: list[int] = []
+        self.length = sum(len(chunk[1]) for chunk in self.chunks)
+        self._update_reach(0)
+
+    @classmethod
+    def _make_chunks(cls, tokens: list[Token]) -> list[list]:
+        return [[0, tokens[i:i + cls.CHUNK_SIZE], max(token.scan_end for token in tokens[i:i + cls.CHUNK_SIZE])]
+                for i in range(0, len(tokens), cls.CHUNK_SIZE)]
+
+    def _update_reach(self, start: int):
+        reach = self.max_reach[start - 1] if start > 0 else 0
+        del self.max_reach[start:]
+        for shift, _, chunk_reach in self.chunks[start:]:
+            reach = max(reach, chunk_reach + shift)
+            self.max_reach.append(reach)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Token]:
+        for shift, tokens, _ in self.chunks:
+            if shift: yield from (token.shifted(shift) for token in tokens)
+            else: yield from tokens
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        """(chunk, index) of the first token whose scan looked past offset, or the end of the stream."""
+        chunk = bisect_right(self.max_reach, offset)
+        if chunk == len(self.chunks):
+            return (chunk - 1, len(self.chunks[-1][1])) if self.chunks else (0, 0)
+        shift, tokens, _ = self.chunks[chunk]
+        return chunk, next(i for i, token in enumerate(tokens) if token.scan_end + shift > offset)
+
+    def position(self, chunk: int, index: int) -> int:
+        """Start of the token at (chunk, index), the end of the last token if it is past the end."""
+        if not self.chunks: return 0
+        shift, tokens, _ = self.chunks[chunk]
+        return tokens[index].start + shift if index < len(tokens) else tokens[-1].end + shift
+
+    def replace(self, chunk: int, index: int, end_chunk: int, end_index: int, new_tokens: list[Token], delta: int):
+        """Replace the tokens from (chunk, index) to (end_chunk, end_index) and move the ones after by delta."""
+        chunks = self.chunks
+
+        # Step 1: the chunks touched by the edit are rebuilt: kept head, new tokens, shifted rest
+        middle = []
+        if chunk < len(chunks):
+            shift, tokens, _ = chunks[chunk]
+            middle = [token.shifted(shift) for token in tokens[:index]] if shift else tokens[:index]
+        middle.extend(new_tokens)
+        stop = min(end_chunk + 1, len(chunks))
+        if end_chunk < len(chunks):
+            shift, tokens, _ = chunks[end_chunk]
+            middle.extend(token.shifted(shift + delta) for token in tokens[end_index:])
+        # absorb the next chunk rather than leaving a small one behind
+        if stop < len(chunks) and len(middle) % self.CHUNK_SIZE < self.CHUNK_SIZE // 2:
+            shift, tokens, _ = chunks[stop]
+            middle.extend(token.shifted(shift + delta) for token in tokens)
+            stop += 1
+
+        # Step 2: the chunks after only get their shift moved
+        for later in chunks[stop:]:
+            later[0] += delta
+        self.length += len(middle) - sum(len(tokens) for _, tokens, _ in chunks[chunk:stop])
+        chunks[chunk:stop] = self._make_chunks(middle)
+        self._update_reach(chunk)
+
+
+class Lexer:
+    def __init__(self, rules: list[tuple[str, str]], context=None):
+        """
+        Compile an ordered list of (token kind, regex) rules into a single char-level DFA.
+        Tokens are produced by maximal munch, ties are broken by rule order.
+        With a compile_context.CompilationContext sub-expressions shared between rules are built once.
+        """
+        self.rules = rules
+        self.context = context
+        self.cuts: list[int] = []
+        self.transitions: list[list[int]] = []      # DFA state x char class -> DFA state (-1 is dead)
+        self.accepting: list[Optional[str]] = []    # DFA state -> token kind (None if not accepting)
+
+        if rules:
+            self._build()
+        self._build_ascii_table()
+
+    def _build(self):
+        # Step 1: one NFA per rule sharing the state counter, joined by a new start state
+        builder = self.context.builder if self.context else NFA()
+        start = builder.create_state()
+        rule_of: dict[State, int] = {}
+        if self.context:
+            for _, regex in self.rules: self.context.add(regex)
+        for index, (_, regex) in enumerate(self.rules):
+            nfa = self.context.build_nfa(regex) if self.context else builder.build_nfa(regex)
+            start.add_transition(nfa.initial_state)
+            rule_of[nfa.terminating_state] = index
+
+        # Step 2: compute char classes from every edge symbol in the NFA
+        symbols, visited, queue = set(), {start}, deque([start])
+        while queue:
+            state = queue.popleft()
+            for symbol, next_states in state.transitions.items():
+                if symbol != "ε": symbols.add(symbol)
+                for next_state in next_states:
+                    if next_state not in visited:
+                        visited.add(next_state)
+                        queue.append(next_state)
+        self.cuts = build_char_classes(symbols)
+        matching = class_symbols(self.cuts, symbols)
+
+        # Step 3: subset construction over char classes
+        start_closure = epsilon_closure({start})
+        ids = {start_closure: 0}
+        queue = deque([start_closure])
+        self.transitions, self.accepting = [], []
+        while queue:
+            closure = queue.popleft()
+            row = []
+            for cls_symbols in matching:
+                next_states = set()
+                for state in closure:
+                    for symbol in cls_symbols:
+                        next_states.update(state.transitions.get(symbol, ()))
+                if not next_states:
+                    row.append(-1)
+                    continue
+                next_closure = epsilon_closure(next_states)
+                if next_closure not in ids:
+                    ids[next_closure] = len(ids)
+                    queue.append(next_closure)
+                row.append(ids[next_closure])
+            self.transitions.append(row)
+
+            rules = [rule_of[state] for state in closure if state in rule_of]
+            self.accepting.append(self.rules[min(rules)][0] if rules else None)
+
+    def _build_ascii_table(self):
+        self._ascii = [bisect_right(self.cuts, code) for code in range(128)]
+
+    def char_class(self, char: str) -> int:
+        code = ord(char)
+        return self._ascii[code] if code < 128 else bisect_right(self.cuts, code)
+
+    def _scan(self, text: str, pos: int) -> Token:
+        """Longest match starting at pos (one-character ERROR token when nothing matches)."""
+        transitions, accepting, ascii_table, cuts = self.transitions, self.accepting, self._ascii, self.cuts
+        state, i, n = 0, pos, len(text)
+        last_kind, last_end = None, pos
+        while state != -1 and transitions:
+            if i == n:
+                i += 1  # the scanner looked at EOF
+                break
+            code = ord(text[i])
+            state = transitions[state][ascii_table[code] if code < 128 else bisect_right(cuts, code)]
+            i += 1
+            if state != -1 and accepting[state] is not None:
+                last_kind, last_end = accepting[state], i
+        scan_end = max(i, pos + 1)
+        if last_kind is None:
+            return Token(ERROR, text[pos:pos + 1], pos, pos + 1, scan_end)
+        return Token(last_kind, text[pos:last_end], pos, last_end, scan_end)
+
+    def tokenize(self, text: str, pos: int = 0) -> list[Token]:
+        tokens = []
+        while pos < len(text):
+            token = self._scan(text, pos)
+            tokens.append(token)
+            pos = token.end
+        return tokens
+
+    def relex(self, text: str, tokens: Iterable[Token], offset: int, deleted: int, inserted: str) -> tuple[str, TokenStream]:
+        """
+        Apply the edit text[offset:offset+deleted] = inserted and update the token stream.
+
+        Tokens whose scan never reached the edit are kept, lexing restarts at the first one that did,
+        and stops as soon as a new token starts where a shifted old token (past the edit) started.
+        At a token boundary the DFA is always back in its start state, so from there on the old
+        tokens are reused as they are, only shifted by the length change (see TokenStream).
+        A TokenStream is updated in place, any other iterable of tokens is copied into a new one.
+        Returns the new text and its tokens.
+        """
+        stream = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)   # end of the edited region in new_text
+
+        # Step 1: restart at the first token whose scan reached the edit
+        chunk, index = stream.locate(offset)
+        pos = stream.position(chunk, index)
+
+        # Step 2: lex until a new token starts where a shifted old token started
+        chunks, new_tokens = stream.chunks, []
+        old_chunk, old_index = chunk, index
+        while pos < len(new_text):
+            if pos >= edit_end:
+                while old_chunk < len(chunks):
+                    shift, old_tokens, _ = chunks[old_chunk]
+                    if old_index == len(old_tokens):
+                        old_chunk, old_index = old_chunk + 1, 0
+                    elif old_tokens[old_index].start + shift + delta < pos:
+                        old_index += 1
+                    else:
+                        break
+                if old_chunk < len(chunks) and chunks[old_chunk][1][old_index].start + chunks[old_chunk][0] + delta == pos:
+                    stream.replace(chunk, index, old_chunk, old_index, new_tokens, delta)
+                    return new_text, stream
+
+            token = self._scan(new_text, pos)
+            new_tokens.append(token)
+            pos = token.end
+
+        stream.replace(chunk, index, len(chunks), 0, new_tokens, delta)
+        return new_text, stream
+
+    def to_dict(self) -> dict:
+        return {
+            "rules": [list(rule) for rule in self.rules],
+            "cuts": self.cuts,
+            "transitions": self.transitions,
+            "accepting": self.accepting,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Lexer:
+        """Rebuild a compiled lexer without re-running the construction."""
+        lexer = cls.__new__(cls)
+        lexer.rules = [tuple(rule) for rule in data["rules"]]
+        lexer.context = None
+        lexer.cuts = data["cuts"]
+        lexer.transitions = data["transitions"]
+        lexer.accepting = data["accepting"]
+        lexer._build_ascii_table()
+        return lexer
+
+
+def save_lexer_to_json(lexer: Lexer, file_name: str, output_folder: str):
+    """
+    Save the compiled lexer (rules, char classes and DFA tables) to a JSON file.
+    """
+    json_path = os.path.join(output_folder, file_name)
+    os.makedirs(output_folder, exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as json_file:
+        json.dump(lexer.to_dict(), json_file, ensure_ascii=False)
+
+def load_lexer_from_json(json_path: str) -> Lexer:
+    with open(json_path, "r", encoding="utf-8") as json_file:
+        return Lexer.from_dict(json.load(json_file))
+
+
+if __name__ == "__main__":
+    lexer = Lexer([
+        ("IF", "if"),
+        ("ID", "[a-zA-Z][a-zA-Z0-9]*"),
+        ("NUM", "[0-9]+"),
+        ("WS", "( )+"),
+    ])
+
+    text = "if x1 then 42 else y"
+    tokens = lexer.tokenize(text)
+    print([(t.kind, t.lexeme) for t in tokens])
+    assert [t.kind for t in tokens[:3]] == ["IF", "WS", "ID"]
+
+    edits = [(3, 2, "abc"), (0, 0, "x"), (len(text), 0, "9"), (6, 4, ""), (11, 2, "7 + 1")]
+    for offset, deleted, inserted in edits:
+        new_text, new_tokens = lexer.relex(text, tokens, offset, deleted, inserted)
+        expected = lexer.tokenize(new_text)
+        assert list(new_tokens) == expected, f"Failed for edit {(offset, deleted, inserted)}: {list(new_tokens)} != {expected}"
+
+    # Random edits applied one after the other to the same stream, with tiny chunks
+    import random, time
+    rng = random.Random(0)
+    TokenStream.CHUNK_SIZE = 4
+    stream = TokenStream(lexer.tokenize(text))
+    for _ in range(500):
+        offset = rng.randint(0, len(text))
+        deleted = rng.randint(0, min(5, len(text) - offset))
+        inserted = "".join(rng.choice("if x19 ") for _ in range(rng.randint(0, 5)))
+        text, stream = lexer.relex(text, stream, offset, deleted, inserted)
+        assert list(stream) == lexer.tokenize(text) and len(stream) == len(lexer.tokenize(text))
+    TokenStream.CHUNK_SIZE = 512
+
+    # A one-character edit in a large document must cost far less than lexing it again
+    text = "if x1 then 42 else y " * 35000
+    start = time.perf_counter()
+    tokens = lexer.tokenize(text)
+    tokenize_time = time.perf_counter() - start
+    stream = TokenStream(tokens)
+    for offset in (3, len(text) // 2, len(text) - 3):
+        start = time.perf_counter()
+        text, stream = lexer.relex(text, stream, offset, 1, "z")
+        relex_time = time.perf_counter() - start
+        print(f"{len(text) / 1e3:.0f} KB, {len(stream)} tokens, edit at {offset}: "
+              f"relex {relex_time * 1e3:.2f} ms, tokenize {tokenize_time * 1e3:.0f} ms")
+        assert relex_time < tokenize_time / 20, (relex_time, tokenize_time)
+    assert list(stream) == lexer.tokenize(text)
+
+    assert Lexer.from_dict(json.loads(lexer.to_json())).tokenize(text) == list(stream)
+    print("All tests passed!")
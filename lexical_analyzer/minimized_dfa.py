@@ -1,9 +1,5 @@
 import os
 import json
-from nfa import NFA, plot_nfa, save_nfa_to_json
-from dfa import DFA, plot_dfa,save_dfa_to_json
-from utils import plot_fsm
-from test_cases import regex_list
 
 class MinimizedDFA:
     def __init__(self, dfa):
@@ -79,15 +75,10 @@ class MinimizedDFA:
 
 def plot_minimized_dfa(minimized_dfa, output_folder):
     """
-    Visualize the minimized DFA as a graph and save it as an image.
+    Visualize the minimized DFA as a graph and save it as an image (see visualization.plot_minimized_dfa).
     """
-    plot_fsm(
-        transitions=minimized_dfa.minimized_transitions,
-        start_state=minimized_dfa.start_state,
-        accept_states=minimized_dfa.accept_states,
-        file_name="minimized_dfa.png",
-        output_folder=output_folder
-    )
+    from visualization import plot_minimized_dfa as _plot_minimized_dfa
+    _plot_minimized_dfa(minimized_dfa, output_folder)
 
 def save_minimized_dfa_to_json(minimized_dfa, file_name, output_folder):
     """
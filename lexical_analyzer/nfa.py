@@ -3,17 +3,14 @@ from typing import Dict, Optional
 from collections import deque, defaultdict
 import json, os 
 
-import networkx as nx
-import matplotlib.pyplot as plt
-from networkx.drawing.nx_agraph import to_agraph
-
-from regex_preprocessor import infix_to_postfix
-from PIL import Image
+from regex_preprocessor import infix_to_postfix, is_group_marker, is_counter, parse_counter
+import regex_ast
 
 class State:
     def __init__(self, state_num: int):
         self.transitions : Dict[str, list[State]] = defaultdict(list)
         self.state_name = f"S{state_num}"
+        self.tag: Optional[int] = None     # capture slot recorded when a match passes through this state
     
     def add_transition(self, next_state: State, edge: str = "ε") -> None:
         self.transitions[edge].append(next_state)
@@ -25,7 +22,7 @@ class NFA:
         self.initial_state: Optional[State] = initial_state
         self.terminating_state: Optional[State] = terminating_state
     
-    def build_nfa_from_postfix(self, regex: list[str]):
+    def build_nfa_from_postfix(self, regex: list[str], capture: bool = False):
         subsets = []
         op_compilers = {
             "*": self.compile_zero_or_more,
@@ -35,9 +32,17 @@ class NFA:
             "|": self.compile_or,
         }
     
-        postfix = infix_to_postfix(regex)
+        postfix = infix_to_postfix(regex, capture)
         for token in postfix:
-            if token in "|_": 
+            if capture and is_group_marker(token):
+                subset = self.compile_group(subsets[-1], int(token[1:-1]))
+                subsets.pop()
+                subsets.append(subset)
+            elif is_counter(token):
+                subset = self.compile_repeat(subsets[-1], *parse_counter(token))
+                subsets.pop()
+                subsets.append(subset)
+            elif token in "|_": 
                 subset = op_compilers[token](subsets[-2], subsets[-1])
                 subsets.pop()
                 subsets.pop()
@@ -51,6 +56,47 @@ class NFA:
                 
         return subsets[0]
         
+    def build_nfa(self, regex: str, capture: bool = False, simplify: bool = True):
+        """Parse the regex into an AST, simplify it (see regex_ast) and build the NFA from it."""
+        node = regex_ast.parse(regex)
+        if simplify:
+            node = regex_ast.simplify(node, capture)
+        return self.build_nfa_from_ast(node)
+
+    def build_nfa_from_ast(self, node, fragments: Optional[dict] = None):
+        """
+        fragments optionally maps id(sub-tree) to an already minimized automaton (see compile_context),
+        those sub-trees are instantiated from the automaton instead of being rebuilt.
+        """
+        if fragments and id(node) in fragments:
+            return self.compile_fragment(*fragments[id(node)])
+        if isinstance(node, regex_ast.Empty):
+            return self.compile_empty()
+        if isinstance(node, regex_ast.Symbol):
+            return self.compile_variable(node.symbol)
+        if isinstance(node, regex_ast.CharClass):
+            return self.compile_class(node.symbols)
+        if isinstance(node, regex_ast.Group):
+            return self.compile_group(self.build_nfa_from_ast(node.node, fragments), node.index)
+        if isinstance(node, regex_ast.Concat):
+            output = self.build_nfa_from_ast(node.parts[0], fragments)
+            for part in node.parts[1:]:
+                output = self.compile_concat(output, self.build_nfa_from_ast(part, fragments))
+            return output
+        if isinstance(node, regex_ast.Alternation):
+            return self.compile_alternation([self.build_nfa_from_ast(option, fragments) for option in node.options])
+        if isinstance(node, regex_ast.Repeat):
+            op_compilers = {
+                (0, regex_ast.INF): self.compile_zero_or_more,
+                (1, regex_ast.INF): self.compile_one_or_more,
+                (0, 1): self.compile_zero_or_one,
+            }
+            body = self.build_nfa_from_ast(node.node, fragments)
+            if (node.min, node.max) in op_compilers:
+                return op_compilers[(node.min, node.max)](body)
+            return self.compile_repeat(body, node.min, node.max)
+        raise TypeError(f"Not a regex node: {node!r}")
+
     def create_state(self) -> State:
         """create a new state with auto-incremented counter"""
         state = State(self.state_counter)
@@ -69,6 +115,47 @@ class NFA:
             terminating_state=terminating_state
         )
         
+    def compile_empty(self) -> NFA:
+        """  S0 (matches the empty string)  """
+        state = self.create_state()
+        return NFA(initial_state=state, terminating_state=state)
+
+    def compile_class(self, symbols) -> NFA:
+        """  S0 -- one edge per symbol --> Se  """
+        initial_state = self.create_state()
+        terminating_state = self.create_state()
+        
+        for symbol in symbols:
+            initial_state.add_transition(terminating_state, symbol)
+        
+        return NFA(
+            initial_state=initial_state,
+            terminating_state=terminating_state
+        )
+        
+    def compile_fragment(self, transitions: dict, start_state: str, accept_states) -> NFA:
+        """  
+            copy of a (minimized) DFA given as {state: {symbol: next state}},
+            accepting states -- ε --> Se  (unless there is a single accepting state without edges)
+        """
+        states = {name: self.create_state() for name in transitions}
+        for name, state_transitions in transitions.items():
+            for symbol, next_state in state_transitions.items():
+                states[name].add_transition(states[next_state], symbol)
+
+        accept_states = list(accept_states)
+        if len(accept_states) == 1 and not transitions[accept_states[0]]:
+            terminating_state = states[accept_states[0]]
+        else:
+            terminating_state = self.create_state()
+            for name in accept_states:
+                states[name].add_transition(terminating_state)
+
+        return NFA(
+            initial_state=states[start_state],
+            terminating_state=terminating_state
+        )
+        
     def compile_zero_or_more(self, state: NFA) -> NFA:
         """  
             S0 -- state --> Se
@@ -126,6 +213,80 @@ class NFA:
         )
         
         
+    def compile_group(self, state: NFA, index: int) -> NFA:
+        """  
+            S0(open tag) -- state --> Se(close tag)
+            group k records its span in the slots 2k and 2k+1
+        """
+        initial_state = self.create_state()
+        terminating_state = self.create_state()
+        initial_state.tag = 2 * index
+        terminating_state.tag = 2 * index + 1
+        
+        initial_state.add_transition(state.initial_state)
+        state.terminating_state.add_transition(terminating_state)
+        
+        return NFA(
+            initial_state=initial_state,
+            terminating_state=terminating_state
+        )
+        
+    def compile_repeat(self, state: NFA, low: int, high: Optional[int]) -> NFA:
+        """  
+            state{low,high} = state state ... (state (state (...)?)?)?     (high=None: ... state*)
+            the body is determinized and minimized once, every copy is instantiated from that
+            small automaton instead of repeating Thompson's construction (bodies with capture
+            groups are cloned instead, so their tags survive)
+        """
+        if high == 0:
+            return self.compile_empty()
+        copy = self._copier(state)
+
+        parts = [copy() for _ in range(low - 1 if high is None and low > 0 else low)]
+        if high is None:
+            parts.append(self.compile_one_or_more(copy()) if low > 0 else self.compile_zero_or_more(copy()))
+        else:
+            optional = None
+            for _ in range(high - low):
+                body = copy() if optional is None else self.compile_concat(copy(), optional)
+                optional = self.compile_zero_or_one(body)
+            if optional is not None:
+                parts.append(optional)
+        
+        output = parts[0]
+        for part in parts[1:]:
+            output = self.compile_concat(output, part)
+        return output
+    
+    def _copier(self, state: NFA):
+        """Return a function creating fresh copies of the NFA state."""
+        states, queue = [state.initial_state], deque([state.initial_state])
+        index = {state.initial_state: 0}
+        while queue:
+            for next_states in queue.popleft().transitions.values():
+                for next_state in next_states:
+                    if next_state not in index:
+                        index[next_state] = len(states)
+                        states.append(next_state)
+                        queue.append(next_state)
+        
+        if any(s.tag is not None for s in states):
+            def clone() -> NFA:
+                copies = [self.create_state() for _ in states]
+                for original, copy in zip(states, copies):
+                    copy.tag = original.tag
+                    for edge, next_states in original.transitions.items():
+                        for next_state in next_states:
+                            copy.add_transition(copies[index[next_state]], edge)
+                return NFA(initial_state=copies[0], terminating_state=copies[index[state.terminating_state]])
+            return clone
+        
+        from dfa import DFA
+        from minimized_dfa import MinimizedDFA
+        minimized_dfa = MinimizedDFA(DFA(state))
+        return lambda: self.compile_fragment(
+            minimized_dfa.minimized_transitions, minimized_dfa.start_state, minimized_dfa.accept_states)
+    
     def compile_concat(self, state1: NFA, state2: NFA) -> NFA:
         """  
             s1 ---> s2
@@ -159,6 +320,26 @@ class NFA:
             terminating_state=terminating_state
         )
     
+    def compile_alternation(self, states: list[NFA]) -> NFA:
+        """  
+            compile_or with any number of options (tried in order):
+                  state1
+            S0 --/ ...  \-->se
+                 \     /
+                  stateN
+        """
+        initial_state = self.create_state()
+        terminating_state = self.create_state()
+        
+        for state in states:
+            initial_state.add_transition(state.initial_state)
+            state.terminating_state.add_transition(terminating_state)
+        
+        return NFA(
+            initial_state=initial_state,
+            terminating_state=terminating_state
+        )
+    
     def to_dict(self) -> dict:
         """Convert the NFA to a dictionary in the specified JSON format"""
         result = {  "startingState": self.initial_state.state_name }
@@ -188,43 +369,11 @@ class NFA:
 
 def plot_nfa(nfa: NFA, file_name:str, output_folder: str):
     """
-    Visualize the NFA as a graph and save it as an image.
-    :param nfa: The NFA object to visualize.
-    :param output_folder: The folder where the image will be saved.
-    :param file_name: The name of the output image file (default is "nfa.png").
+    Visualize the NFA as a graph and save it as an image (see visualization.plot_nfa).
+    The plotting libraries are only imported when this is called.
     """
-    data = nfa.to_dict()
-    G = nx.DiGraph()
-
-    # Add states (nodes)
-    for state, transitions in data.items():
-        if state == "startingState":
-            continue
-        G.add_node(state, shape="doublecircle" if transitions["isTerminatingState"] else "circle")
-
-        for symbol, next_states in transitions.items():
-            if symbol == "isTerminatingState":
-                continue
-            for next_state in next_states:
-                G.add_edge(state, next_state, label=symbol)
-
-    # Convert to AGraph for styling and layout
-    A = to_agraph(G)
-
-    # Set the initial state
-    A.add_node("st", shape="none", label="")
-    A.add_edge("st", data["startingState"])
-
-    # Configure graph layout
-    A.graph_attr.update(rankdir="LR")
-
-    # Ensure the output folder exists
-    os.makedirs(output_folder, exist_ok=True)
-
-    # Save the graph as an image
-    graph_path = os.path.join(output_folder, file_name)
-    A.layout(prog="dot")
-    A.draw(graph_path)
+    from visualization import plot_nfa as _plot_nfa
+    _plot_nfa(nfa, file_name, output_folder)
 
 def save_nfa_to_json(nfa: NFA, file_name: str, output_folder: str):
     """
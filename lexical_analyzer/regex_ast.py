@@ -0,0 +1,361 @@
+"""
+Regex parser producing a typed AST, and an algebraic simplifier for it.
+
+Same grammar as regex_preprocessor (| concatenation _ * + ? {m,n} ( ) [ ] x-y, '.' matches anything),
+but every node keeps the position it was parsed at so errors can point into the source.
+
+simplify() rewrites the tree before any automaton is built:
+    - nested repeats collapse:              a** -> a*,  (a?)* -> a*,  (a+)? -> a*
+    - groups only group:                    ((a)) -> a
+    - duplicate alternatives are removed:   a|b|a -> [a-b]
+    - common prefixes are factored out:     ab|ac -> a(b|c),  ab|a -> ab?
+    - single characters and classes merge:  a|[b-d]|e -> [a-e],  [a] -> a
+With capture=True groups are kept and only rewrites that can't change group spans are applied
+(e.g. only single-character prefixes are factored out).
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Optional
+
+from regex_preprocessor import symbol_bounds, parse_counter
+
+INF = None  # max of an unbounded repeat
+
+
+@dataclass(frozen=True)
+class Empty:
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class Symbol:
+    symbol: str                 # "a", "a-z" or "."
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class CharClass:
+    symbols: tuple[str, ...]
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class Concat:
+    parts: tuple
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class Alternation:
+    options: tuple
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class Repeat:
+    node: object
+    min: int
+    max: Optional[int]          # INF for * and +
+    pos: int = field(default=-1, compare=False)
+
+@dataclass(frozen=True)
+class Group:
+    node: object
+    index: int
+    pos: int = field(default=-1, compare=False)
+
+
+REPEAT_OPERATORS = {"*": (0, INF), "+": (1, INF), "?": (0, 1)}
+
+
+class _Parser:
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.i = 0
+        self.group_count = 0
+
+    def error(self, message: str):
+        raise ValueError(f"{message} at position {self.i} in {self.regex!r}")
+
+    def peek(self) -> Optional[str]:
+        return self.regex[self.i] if self.i < len(self.regex) else None
+
+    def parse(self):
+        node = self.parse_alternation()
+        if self.peek() is not None:
+            self.error(f"Unexpected {self.peek()!r}")
+        return node
+
+    def parse_alternation(self):
+        pos = self.i
+        options = [self.parse_concat()]
+        while self.peek() == "|":
+            self.i += 1
+            options.append(self.parse_concat())
+        return options[0] if len(options) == 1 else Alternation(tuple(options), pos)
+
+    def parse_concat(self):
+        pos = self.i
+        parts = []
+        while self.peek() is not None and self.peek() not in "|)":
+            if self.peek() == "_":  # explicit concatenation operator
+                self.i += 1
+                continue
+            parts.append(self.parse_repeat())
+        if not parts:
+            return Empty(pos)
+        return parts[0] if len(parts) == 1 else Concat(tuple(parts), pos)
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        while self.peek() is not None and self.peek() in REPEAT_OPERATORS or self.peek() == "{":
+            pos = self.i
+            if self.peek() == "{":
+                end = self.regex.find("}", self.i)
+                if end == -1: self.error("Missing '}'")
+                try:
+                    low, high = parse_counter(self.regex[self.i:end + 1])
+                except ValueError as error:
+                    self.error(str(error))
+                self.i = end + 1
+            else:
+                low, high = REPEAT_OPERATORS[self.peek()]
+                self.i += 1
+            node = Repeat(node, low, high, pos)
+        return node
+
+    def parse_atom(self):
+        pos, char = self.i, self.peek()
+        if char == "(":
+            self.i += 1
+            self.group_count += 1
+            index = self.group_count
+            node = self.parse_alternation()
+            if self.peek() != ")": self.error("Missing ')'")
+            self.i += 1
+            return Group(node, index, pos)
+        if char == "[":
+            self.i += 1
+            symbols = []
+            while self.peek() is not None and self.peek() != "]":
+                symbols.append(self.parse_symbol())
+            if self.peek() != "]": self.error("Missing ']'")
+            if not symbols: self.error("Empty '[]'")
+            self.i += 1
+            return CharClass(tuple(symbols), pos)
+        if char in "*+?{":
+            self.error(f"Nothing to repeat before {char!r}")
+        if char in ")]|":
+            self.error(f"Unexpected {char!r}")
+        return Symbol(self.parse_symbol(), pos)
+
+    def parse_symbol(self) -> str:
+        if self.i + 1 < len(self.regex) and self.regex[self.i + 1] == "-":
+            if self.i + 2 >= len(self.regex): self.error("Unterminated range")
+            symbol = self.regex[self.i:self.i + 3]
+            self.i += 3
+            return symbol
+        self.i += 1
+        return self.regex[self.i - 1]
+
+
+def parse(regex: str):
+    return _Parser(regex).parse()
+
+
+def group_count(regex: str) -> int:
+    """Number of capture groups ("(" inside [...] is a literal, not a group)."""
+    parser = _Parser(regex)
+    parser.parse()
+    return parser.group_count
+
+
+# --- simplification -------------------------------------------------------------------------------
+
+def _class_symbols(node) -> Optional[tuple[str, ...]]:
+    if isinstance(node, Symbol): return (node.symbol,)
+    if isinstance(node, CharClass): return node.symbols
+    return None
+
+def make_class(symbols, pos: int = -1):
+    """Normalize a set of symbols: ranges sorted and merged, "." swallows everything, one symbol -> Symbol."""
+    if "." in symbols:
+        return Symbol(".", pos)
+    merged = []
+    for lo, hi in sorted(symbol_bounds(symbol) for symbol in symbols):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    symbols = tuple(chr(lo) if lo == hi else f"{chr(lo)}-{chr(hi)}" for lo, hi in merged)
+    return Symbol(symbols[0], pos) if len(symbols) == 1 else CharClass(symbols, pos)
+
+def _split_head(node):
+    if isinstance(node, Concat):
+        rest = node.parts[1:]
+        return node.parts[0], (rest[0] if len(rest) == 1 else Concat(rest, node.pos))
+    return node, Empty(node.pos)
+
+def _runs(items, key, adjacent_only: bool) -> list[list]:
+    """Group items by key, either anywhere in the list or only consecutive ones."""
+    runs = []
+    for item in items:
+        k = key(item)
+        if k is not None:
+            if adjacent_only:
+                if runs and runs[-1][0] == k:
+                    runs[-1][1].append(item)
+                    continue
+            else:
+                match = next((run for run in runs if run[0] == k), None)
+                if match is not None:
+                    match[1].append(item)
+                    continue
+        runs.append((k, [item]))
+    return runs
+
+
+def _simplify_repeat(node: Repeat, capture: bool):
+    inner = _simplify(node.node, capture)
+    if isinstance(inner, Empty) or (node.min, node.max) == (0, 0):
+        return Empty(node.pos)
+    if (node.min, node.max) == (1, 1):
+        return inner
+    if isinstance(inner, Repeat) and inner.max is INF and node.max is INF:
+        # (x{a,})+ = x{a,}  and  (x{a,})* = x* for a <= 1
+        if node.min == 1 or (node.min == 0 and inner.min <= 1):
+            return Repeat(inner.node, inner.min * node.min, INF, node.pos)
+    if isinstance(inner, Repeat) and inner.min in (0, 1) and node.min in (0, 1) \
+            and inner.max in (1, INF) and node.max in (1, INF):
+        # (x{a,b}){c,d} with a, c in {0, 1} and b, d in {1, inf}:  x** = x*, (x?)+ = x*, (x?)? = x?, ...
+        high = INF if INF in (inner.max, node.max) else 1
+        return Repeat(inner.node, inner.min * node.min, high, node.pos)
+    return Repeat(inner, node.min, node.max, node.pos)
+
+def _simplify_concat(node: Concat, capture: bool):
+    parts = []
+    for part in (_simplify(part, capture) for part in node.parts):
+        if isinstance(part, Concat): parts.extend(part.parts)
+        elif not isinstance(part, Empty): parts.append(part)
+    if not parts: return Empty(node.pos)
+    return parts[0] if len(parts) == 1 else Concat(tuple(parts), node.pos)
+
+def _simplify_alternation(node: Alternation, capture: bool):
+    # Step 1: flatten and drop duplicates (a later duplicate can never win)
+    options = []
+    for option in (_simplify(option, capture) for option in node.options):
+        for option in (option.options if isinstance(option, Alternation) else (option,)):
+            if option not in options: options.append(option)
+
+    # Step 2: factor common prefixes  ab|ac -> a(b|c)
+    # with capture only single characters are factored: a head like a* would try its lengths in a
+    # different order once shared by all the tails, moving the groups after it (a*(a)|a* -> a*(a)?)
+    def head_key(option):
+        head = _split_head(option)[0]
+        return head if not capture or _class_symbols(head) else None
+
+    factored = []
+    for head, run in _runs(options, head_key, adjacent_only=capture):
+        if len(run) == 1:
+            factored.append(run[0])
+        else:
+            tails = Alternation(tuple(_split_head(option)[1] for option in run), run[0].pos)
+            factored.append(_simplify(Concat((head, tails), run[0].pos), capture))
+
+    # Step 3: merge single characters and classes  a|[b-d] -> [a-d]
+    merged = []
+    for key, run in _runs(factored, lambda option: "class" if _class_symbols(option) else None, adjacent_only=capture):
+        if key is None or len(run) == 1:
+            merged.extend(run)
+        else:
+            merged.append(make_class([symbol for option in run for symbol in _class_symbols(option)], run[0].pos))
+
+    # Step 4: an empty alternative makes the rest optional  a|() -> a?
+    if any(isinstance(option, Empty) for option in merged) and not (capture and not isinstance(merged[-1], Empty)):
+        rest = [option for option in merged if not isinstance(option, Empty)]
+        if not rest: return Empty(node.pos)
+        rest = rest[0] if len(rest) == 1 else Alternation(tuple(rest), node.pos)
+        return _simplify(Repeat(rest, 0, 1, node.pos), capture)
+
+    return merged[0] if len(merged) == 1 else Alternation(tuple(merged), node.pos)
+
+def _simplify(node, capture: bool):
+    if isinstance(node, CharClass):
+        return make_class(node.symbols, node.pos)
+    if isinstance(node, Group):
+        inner = _simplify(node.node, capture)
+        return Group(inner, node.index, node.pos) if capture else inner
+    if isinstance(node, Repeat):
+        return _simplify_repeat(node, capture)
+    if isinstance(node, Concat):
+        return _simplify_concat(node, capture)
+    if isinstance(node, Alternation):
+        return _simplify_alternation(node, capture)
+    return node
+
+def simplify(node, capture: bool = False):
+    """Rewrite until nothing changes any more."""
+    while True:
+        simplified = _simplify(node, capture)
+        if simplified == node:
+            return simplified
+        node = simplified
+
+
+# --- printing ----------------------------------------------------------------------------------------
+
+def to_regex(node) -> str:
+    """Back to the repo's regex syntax (groups that were removed by simplify are added back as needed)."""
+    if isinstance(node, Empty): return "()"
+    if isinstance(node, Symbol): return f"[{node.symbol}]" if len(node.symbol) == 3 else node.symbol
+    if isinstance(node, CharClass): return "[" + "".join(node.symbols) + "]"
+    if isinstance(node, Group): return "(" + to_regex(node.node) + ")"
+    if isinstance(node, Alternation): return "|".join(to_regex(option) for option in node.options)
+    if isinstance(node, Concat):
+        return "".join(f"({to_regex(part)})" if isinstance(part, Alternation) else to_regex(part) for part in node.parts)
+    if isinstance(node, Repeat):
+        inner = to_regex(node.node)
+        if not isinstance(node.node, (Symbol, CharClass, Group)): inner = f"({inner})"
+        operator = {(0, INF): "*", (1, INF): "+", (0, 1): "?"}.get((node.min, node.max))
+        if operator is None:
+            operator = f"{{{node.min}}}" if node.min == node.max else f"{{{node.min},{'' if node.max is INF else node.max}}}"
+        return inner + operator
+    raise TypeError(f"Not a regex node: {node!r}")
+
+
+if __name__ == "__main__":
+    test_cases = [
+        ("a**", "a*"),
+        ("(a?)*", "a*"),
+        ("(a+)?", "a*"),
+        ("(a?)?", "a?"),
+        ("((a))", "a"),
+        ("[a]", "a"),
+        ("a|a", "a"),
+        ("a|b|a", "[a-b]"),
+        ("[abc]|[d-f]", "[a-f]"),
+        ("ab|ac", "a[b-c]"),
+        ("ab|cd|ef", "ab|cd|ef"),
+        ("ab|a", "ab?"),
+        ("[a-zA-Z0-9]+", "[0-9A-Za-z]+"),
+        ("(a|b)*abb", "[a-b]*abb"),
+        ("a.|b", "a.|b"),
+        ("[0-9]{4}", "[0-9]{4}"),
+        ("a{1,}", "a+"),
+        ("a{0,1}", "a?"),
+        ("a{1}b{0}", "a"),
+        ("(a{2,})*", "(a{2,})*"),
+        ("(a{2,})+", "a{2,}"),
+        ("[0-9]{1,255}", "[0-9]{1,255}"),
+    ]
+
+    for regex, expected in test_cases:
+        result = to_regex(simplify(parse(regex)))
+        print(f"Input: {regex:<14} Output: {result}")
+        assert result == expected, f"Failed for {regex}. Expected {expected}, got {result}"
+
+    assert parse("a(b|c)").parts[1].pos == 1
+    assert to_regex(simplify(parse("((a))|(a)b"), capture=True)) == "((a))|(a)b"
+    for bad_regex in ["(a", "a)", "*a", "[]", "[ab", "a{3,2}", "a{x}", "a{2"]:
+        try:
+            parse(bad_regex)
+        except ValueError as error:
+            print(error)
+        else:
+            raise AssertionError(f"{bad_regex} should not parse")
+    print("All tests passed!")
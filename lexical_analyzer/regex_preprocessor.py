@@ -2,14 +2,58 @@
 
 - operator precedence:
     1. paranthesis: ()
-    2. counters:    * + ?
+    2. counters:    * + ? {m} {m,} {m,n}
     3. concetation: ab
     4. disjuntion:  a | b
     5. range        [] 
     
 - use _ as concate operator as '.' mean anything
+
+- with capture=True every "(...)" group also emits a marker "(k)" right after its body in the postfix,
+  groups are numbered by their opening paranthesis starting from 1 (like python's re)
 """
 
+from typing import Optional
+
+
+def symbol_bounds(symbol: str):
+    """
+    Return the inclusive code point range an edge symbol matches:
+        "a"   -> (97, 97)
+        "a-z" -> (97, 122)
+        "."   -> None (matches any character)
+    """
+    if symbol == ".":
+        return None
+    if len(symbol) == 3 and symbol[1] == "-":
+        return ord(symbol[0]), ord(symbol[2])
+    return ord(symbol), ord(symbol)
+
+def group_marker(index: int) -> str:
+    return f"({index})"
+
+def is_range(token: str) -> bool:
+    return len(token) == 3 and token[1] == "-"
+
+def is_group_marker(token: str) -> bool:
+    """ "(1)" is a marker, "(-)" is the range from "(" to ")" """
+    return len(token) > 2 and token[0] == "(" and token[-1] == ")" and token[1:-1].isdigit()
+
+
+def is_counter(token: str) -> bool:
+    return len(token) > 2 and token[0] == "{" and token[-1] == "}" and not is_range(token)
+
+def parse_counter(token: str) -> tuple[int, Optional[int]]:
+    """ "{3}" -> (3, 3),  "{2,}" -> (2, None),  "{1,255}" -> (1, 255) """
+    low, _, high = token[1:-1].partition(",")
+    if not low.isdigit() or (high and not high.isdigit()):
+        raise ValueError(f"Invalid counter {token!r}")
+    low = int(low)
+    high = low if "," not in token else (int(high) if high else None)
+    if high is not None and high < low:
+        raise ValueError(f"Invalid counter {token!r}: {high} < {low}")
+    return low, high
+
 
 def __tokenize_regex(regex:str) -> list[tuple[str, str]]:
     tokens = []
@@ -18,6 +62,12 @@ def __tokenize_regex(regex:str) -> list[tuple[str, str]]:
         if regex[i] == "-":                         #"a-z"
             tokens[-1] = (regex[i-1:i+2], "var")    # remove a & add a-z
             i += 2                                  # skip z                    
+        elif regex[i] == "{" and regex[i+1:i+2] != "-":   #"{m,n}" ("{-}" is a range)
+            end = regex.find("}", i)
+            if end == -1:
+                raise ValueError(f"Missing '}}' at position {i} in {regex!r}")
+            tokens.append((regex[i:end+1], "op"))
+            i = end + 1
         elif regex[i] in "()[]*+?_|":
             tokens.append((regex[i], "op"))
             i += 1
@@ -47,7 +97,7 @@ def __insert_concate(tokens: list[tuple[str, str]]) -> list[tuple[str, str]]:
         curr_token, curr_type = tokens[i]
         nxt_token, nxt_type = tokens[i+1]
 
-        if ((curr_type == "var" or curr_token in ")]*+?") 
+        if ((curr_type == "var" or curr_token in ")]*+?" or is_counter(curr_token)) 
             and (nxt_type == "var" or nxt_token in "([")) :
             new_tokens.append(("_", "op"))
     
@@ -56,14 +106,17 @@ def __insert_concate(tokens: list[tuple[str, str]]) -> list[tuple[str, str]]:
 
 
 
-def infix_to_postfix(regex: str) -> str:
+def infix_to_postfix(regex: str, capture: bool = False) -> list[str]:
     operators = {"*": -1, "+": -2, "?": -3, "_": -4, "|": -5, "(": -100, "[": -100}
+    precedence = lambda op: -1 if is_counter(op) else operators[op]
     
     tokens = __replace_range(__tokenize_regex(regex))
     tokens = __insert_concate(tokens)
     
     postfix_expr = []
     op_stack = []
+    group_stack = []
+    group_count = 0
     
     def pop_op_stack():
         postfix_expr.append(op_stack[-1])
@@ -72,13 +125,18 @@ def infix_to_postfix(regex: str) -> str:
     for (token, type) in tokens:
         if token in '([':
             op_stack.append(token)
+            if token == '(':
+                group_count += 1
+                group_stack.append(group_count)
             
         elif token in ')]':
             while op_stack[-1] not in '([': pop_op_stack()
-            op_stack.pop()
+            if op_stack.pop() == '(':
+                group_index = group_stack.pop()
+                if capture: postfix_expr.append(group_marker(group_index))
             
         elif type == "op":
-            while len(op_stack) != 0 and operators[token] <= operators[op_stack[-1]]:  pop_op_stack()
+            while len(op_stack) != 0 and precedence(token) <= precedence(op_stack[-1]):  pop_op_stack()
             op_stack.append(token)
             
         else:
@@ -97,10 +155,31 @@ if __name__ == "__main__":
         ("a.b", ["a", ".", "_", "b", "_"]), 
         ("[a-z]?e", ["a-z", "?", "e", "_"]),
         ("a(b|c)*", ["a", "b", "c", "|", "*", "_"]),
+        ("a{2,3}b", ["a", "{2,3}", "b", "_"]),
+        ("[0-9]{4}", ["0-9", "{4}"]),
+        ("(ab){1,}c", ["a", "b", "_", "{1,}", "c", "_"]),
     ]
     
     for infix, expected in test_cases:
         result = infix_to_postfix(infix)
         print(f"Input: {infix:<10} Output: {result}")
         assert result == expected, f"Failed for {infix}. Expected {expected}, got {result}"
+
+    capture_test_cases = [
+        ("(a|b)*", ["a", "b", "|", "(1)", "*"]),
+        ("((a)b)", ["a", "(2)", "b", "_", "(1)"]),
+        ("[a-c](d)?", ["a-c", "d", "(1)", "?", "_"]),
+    ]
+
+    for infix, expected in capture_test_cases:
+        result = infix_to_postfix(infix, capture=True)
+        print(f"Input: {infix:<10} Output: {result}")
+        assert result == expected, f"Failed for {infix}. Expected {expected}, got {result}"
+    assert parse_counter("{3}") == (3, 3) and parse_counter("{2,}") == (2, None) and parse_counter("{1,255}") == (1, 255)
+    assert infix_to_postfix("[(-)]") == ["(-)"] and infix_to_postfix("[{-}]a", capture=True) == ["{-}", "a", "_"]
+    try:
+        infix_to_postfix("a{2")
+        raise AssertionError("'a{2' should be rejected")
+    except ValueError as error:
+        assert str(error) == "Missing '}' at position 1 in 'a{2'", error
     print("All tests passed!")
\ No newline at end of file
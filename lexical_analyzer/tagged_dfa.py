@@ -0,0 +1,184 @@
+from __future__ import annotations
+from typing import Optional
+from bisect import bisect_right
+from collections import deque
+
+import regex_ast
+from nfa import NFA, State
+from lexer import build_char_classes, class_symbols
+
+Span = Optional[tuple[int, int]]
+
+
+class TaggedDFA:
+    def __init__(self, regex: str):
+        """
+        Match a regex and extract its capture groups in a single pass over the input.
+
+        A DFA state is the list of NFA states still alive, in priority order (the order python's re
+        would try them in). Every transition also carries, for each NFA state it leads to, the index of
+        the source state whose registers are inherited and the tags (group boundaries) crossed on the way.
+        Transitions are built lazily the first time they are taken and cached, so after warm up each
+        character costs one table lookup plus the register updates.
+
+        Spans agree with python's re except when a repeated sub-expression can match the empty string
+        (e.g. "((b)?)*"): re refuses empty loop iterations, which a single pass cannot know about.
+        """
+        self.regex = regex
+        self.group_count = regex_ast.group_count(regex)
+        self.nfa = NFA().build_nfa(regex, capture=True)
+
+        # Step 1: collect edge symbols and split them into disjoint char classes
+        symbols, visited, queue = set(), {self.nfa.initial_state}, deque([self.nfa.initial_state])
+        while queue:
+            state = queue.popleft()
+            for symbol, next_states in state.transitions.items():
+                if symbol != "ε": symbols.add(symbol)
+                for next_state in next_states:
+                    if next_state not in visited:
+                        visited.add(next_state)
+                        queue.append(next_state)
+        self.cuts = build_char_classes(symbols)
+        self._class_symbols = class_symbols(self.cuts, symbols)
+        self._ascii = [bisect_right(self.cuts, code) for code in range(128)]
+
+        # Step 2: one lazily built automaton per matching mode
+        self._automata = {mode: _Automaton(self, mode) for mode in ("fullmatch", "match")}
+
+    def _closure(self, roots: list[tuple[State, int, tuple]], first_match: bool) -> tuple[tuple, tuple]:
+        """
+        Priority ordered epsilon-closure of roots = [(nfa state, source thread, tags), ...].
+        Only states with symbol edges or the final state are kept.
+        With first_match the states after the final state are dropped (they can never win).
+        """
+        states, ops, visited = [], [], set()
+        for root, source, root_tags in roots:
+            stack = [(root, root_tags)]
+            while stack:
+                state, tags = stack.pop()
+                if state in visited: continue
+                visited.add(state)
+                if state.tag is not None: tags = tags + (state.tag,)
+
+                if state is self.nfa.terminating_state or len(state.transitions) > ("ε" in state.transitions):
+                    states.append(state)
+                    ops.append((source, tags))
+                    if first_match and state is self.nfa.terminating_state:
+                        return tuple(states), tuple(ops)
+
+                for next_state in reversed(state.transitions.get("ε", [])):
+                    stack.append((next_state, tags))
+        return tuple(states), tuple(ops)
+
+    def _run(self, text: str, mode: str) -> Optional[list[Span]]:
+        automaton = self._automata[mode]
+        ascii_table, cuts = self._ascii, self.cuts
+
+        state_id = automaton.start
+        registers = self._apply(automaton.start_ops, [[-1] * (2 * self.group_count + 2)], 0)
+        best = None
+        for pos in range(len(text) + 1):
+            final_index = automaton.final_index[state_id]
+            if final_index != -1 and (mode == "match" or pos == len(text)):
+                best = registers[final_index], pos
+            if pos == len(text): break
+
+            code = ord(text[pos])
+            state_id, ops = automaton.step(state_id, ascii_table[code] if code < 128 else bisect_right(cuts, code))
+            if state_id == -1: break
+            registers = self._apply(ops, registers, pos + 1)
+
+        if best is None:
+            return None
+
+        slots, end = best
+        slots = [0, end] + slots[2:]
+        return [(slots[2 * k], slots[2 * k + 1]) if slots[2 * k] != -1 and slots[2 * k + 1] != -1 else None
+                for k in range(self.group_count + 1)]
+
+    @staticmethod
+    def _apply(ops, registers, pos):
+        new_registers = []
+        for source, tags in ops:
+            slots = registers[source]
+            if tags:
+                slots = slots[:]
+                for tag in tags: slots[tag] = pos
+            new_registers.append(slots)
+        return new_registers
+
+    def fullmatch(self, text: str) -> Optional[list[Span]]:
+        """Spans of group 0 (whole match) and every capture group if the whole text matches, else None."""
+        return self._run(text, "fullmatch")
+
+    def match(self, text: str) -> Optional[list[Span]]:
+        """Like re.match: the highest priority match anchored at the start of text."""
+        return self._run(text, "match")
+
+
+class _Automaton:
+    def __init__(self, tagged_dfa: TaggedDFA, mode: str):
+        self.tagged_dfa = tagged_dfa
+        self.first_match = mode == "match"
+        self.ids: dict[tuple, int] = {}
+        self.states: list[tuple] = []
+        self.rows: list[list] = []
+        self.final_index: list[int] = []
+
+        root = tagged_dfa.nfa.initial_state
+        states, self.start_ops = tagged_dfa._closure([(root, 0, ())], self.first_match)
+        self.start = self._add(states)
+
+    def _add(self, states: tuple) -> int:
+        if states not in self.ids:
+            self.ids[states] = len(self.states)
+            self.states.append(states)
+            self.rows.append([None] * len(self.tagged_dfa._class_symbols))
+            final = self.tagged_dfa.nfa.terminating_state
+            self.final_index.append(states.index(final) if final in states else -1)
+        return self.ids[states]
+
+    def step(self, state_id: int, cls: int) -> tuple[int, tuple]:
+        cached = self.rows[state_id][cls]
+        if cached is not None:
+            return cached
+
+        roots = []
+        for source, state in enumerate(self.states[state_id]):
+            for symbol in self.tagged_dfa._class_symbols[cls]:
+                for next_state in state.transitions.get(symbol, ()):
+                    roots.append((next_state, source, ()))
+
+        states, ops = self.tagged_dfa._closure(roots, self.first_match)
+        cached = (self._add(states), ops) if states else (-1, ())
+        self.rows[state_id][cls] = cached
+        return cached
+
+
+if __name__ == "__main__":
+    import re
+
+    test_cases = [
+        ("(a|b)*abb", ["abb", "babb", "aabb", "ab"]),
+        ("([a-z]+)([0-9]*)", ["abc123", "x", "x9", "9"]),
+        ("((a)|b)*", ["", "ab", "ba", "aab"]),
+        ("(a*)(a*)", ["", "a", "aaa"]),
+        ("(N|[oO]h?)?[a-z]*(g[.]?r[.]?e[.]?a[.]?t)[a-z]*", ["great", "Ohgreat", "Ng.r.e.a.tness", "grea"]),
+        ("[(]a(b)?", ["(a", "(ab", "ab"]),
+        ("a*(a)|a*", ["", "a", "aa"]),
+        ("a(b)|a(c)|a", ["ab", "ac", "a"]),
+    ]
+
+    for regex, texts in test_cases:
+        pattern = re.compile(regex.replace("[.]", "."), re.DOTALL)
+        tagged_dfa = TaggedDFA(regex)
+        for text in texts:
+            for mode in ("fullmatch", "match"):
+                expected = getattr(pattern, mode)(text)
+                if expected is not None:
+                    expected = [expected.span(k) if expected.span(k) != (-1, -1) else None
+                                for k in range(pattern.groups + 1)]
+                result = getattr(tagged_dfa, mode)(text)
+                print(f"{mode:<9} {regex:<20} {text!r:<16} {result}")
+                assert result == expected, f"Failed for {regex} on {text!r}. Expected {expected}, got {result}"
+    print("All tests passed!")
@@ -0,0 +1,304 @@
+"""
+Local tokenization service.
+
+Compiled lexers (JSON files written by lexer.save_lexer_to_json, one per lexer, named <lexer>.json)
+are loaded once and shared read-only with a pool of worker processes. Clients talk line-delimited JSON
+over a Unix socket or localhost TCP:
+
+    -> {"id": 1, "lexer": "c", "text": "int x = 42;"}
+    <- {"id": 1, "tokens": [["INT", 0, 3], ["WS", 3, 4], ...]}
+
+    -> {"id": 2, "stats": true}
+    <- {"id": 2, "stats": {"requests": ..., "latency_ms": {"p50": ..., "p90": ..., "p99": ...}, ...}}
+
+Requests arriving within max_delay of each other are sent to the pool as one batch. A request line longer
+than max_line_bytes is skipped and answered with an error.
+
+    python tokenize_server.py LEXER_DIR [--unix PATH | --port PORT] [--workers N] [--max-line-bytes N]
+    python tokenize_server.py --self-test
+"""
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import load_lexer_from_json
+
+_LEXERS = {}    # lexer name -> Lexer, set in the server process and inherited (or loaded) by the workers
+
+
+def load_lexers(lexer_dir: str) -> dict:
+    global _LEXERS
+    _LEXERS = {os.path.splitext(os.path.basename(path))[0]: load_lexer_from_json(path)
+               for path in sorted(glob.glob(os.path.join(lexer_dir, "*.json")))}
+    return _LEXERS
+
+
+def tokenize_batch(batch: list[tuple[str, str]]) -> list:
+    """Runs in a worker: [(lexer name, text), ...] -> [[[kind, start, end], ...] or {"error": ...}, ...]"""
+    results = []
+    for name, text in batch:
+        # one failing request must not take the rest of its batch down
+        try:
+            lexer = _LEXERS.get(name)
+            if lexer is None:
+                results.append({"error": f"Unknown lexer {name!r}"})
+            else:
+                results.append([[token.kind, token.start, token.end] for token in lexer.tokenize(text)])
+        except Exception as error:
+            results.append({"error": str(error)})
+    return results
+
+
+async def read_line(reader: asyncio.StreamReader) -> bytes:
+    """
+    The next line (b"" at the end of the stream). A line longer than the reader's limit is dropped up to
+    its newline and raises ValueError, so the stream stays in sync with the next request.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial                # last line without a newline
+    except asyncio.LimitOverrunError as error:
+        consumed = error.consumed
+    size = 0
+    while True:
+        size += len(await reader.readexactly(consumed))
+        try:
+            size += len(await reader.readuntil(b"\n"))
+            break
+        except asyncio.IncompleteReadError as error:
+            size += len(error.partial)
+            break
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+    raise ValueError(f"Line of {size} bytes exceeds the limit")
+
+
+class Stats:
+    def __init__(self, window: int = 10000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.characters = 0
+        self.latencies = deque(maxlen=window)   # seconds, most recent requests only
+
+    def record(self, latency: float, characters: int):
+        self.requests += 1
+        self.characters += characters
+        self.latencies.append(latency)
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 3) if latencies else None
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "uptime_s": round(elapsed, 3),
+            "requests_per_s": round(self.requests / elapsed, 3),
+            "mb_per_s": round(self.characters / elapsed / 1e6, 6),
+            "latency_ms": {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99)},
+        }
+
+
+class TokenizeServer:
+    def __init__(self, lexer_dir: str, workers: int = None, max_batch: int = 64, max_delay: float = 0.002,
+                 max_line_bytes: int = 2 ** 24):
+        self.lexer_dir = lexer_dir
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_line_bytes = max_line_bytes    # StreamReader limit, asyncio's default of 64 KiB is too small for documents
+        self.stats = Stats()
+        self.queue: asyncio.Queue = None
+        self.tasks = set()      # running _run_batch tasks (the event loop only keeps weak references)
+
+        # Lexers are loaded here once; forked workers inherit them instead of loading their own copy
+        load_lexers(lexer_dir)
+        if "fork" in multiprocessing.get_all_start_methods():
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            self.pool = ProcessPoolExecutor(workers, initializer=load_lexers, initargs=(lexer_dir,))
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats.batches += 1
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, tokenize_batch, [(name, text) for name, text, _ in batch])
+        except Exception as error:
+            results = [{"error": str(error)}] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done(): future.set_result(result)
+
+    async def _handle_request(self, request) -> dict:
+        if not isinstance(request, dict):
+            return {"error": "Bad request: expected a JSON object"}
+        if request.get("stats"):
+            return {"id": request.get("id"), "stats": self.stats.to_dict()}
+
+        name, text = request.get("lexer"), request.get("text", "")
+        if not isinstance(name, str) or not isinstance(text, str):
+            return {"id": request.get("id"), "error": "Bad request: 'lexer' and 'text' must be strings"}
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((name, text, future))
+        result = await future
+        self.stats.record(time.perf_counter() - started, len(text))
+
+        if isinstance(result, dict):
+            return {"id": request.get("id"), **result}
+        return {"id": request.get("id"), "tokens": result}
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+
+        async def send(response: dict):
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        async def respond(line: bytes):
+            try:
+                response = await self._handle_request(json.loads(line))
+            except ValueError as error:
+                response = {"error": f"Bad request: {error}"}
+            await send(response)
+
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await read_line(reader)
+                except ValueError as error:     # oversized line, already skipped
+                    await send({"error": f"Bad request: {error}"})
+                    continue
+                if not line: break
+                # Requests of one connection are handled concurrently (answers carry the request id)
+                task = asyncio.ensure_future(respond(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending: await asyncio.wait(pending)
+        finally:
+            writer.close()
+
+    async def start(self, unix_path: str = None, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Start the batcher and listen (port 0 picks a free port), the caller serves and closes."""
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.ensure_future(self._batcher())
+        # Start the workers before listening: forked later they would inherit the client sockets,
+        # and closing a connection here would never reach the client
+        await asyncio.get_running_loop().run_in_executor(self.pool, tokenize_batch, [])
+        if unix_path:
+            return await asyncio.start_unix_server(self._handle_client, path=unix_path, limit=self.max_line_bytes)
+        return await asyncio.start_server(self._handle_client, host, port, limit=self.max_line_bytes)
+
+    def close(self):
+        self.batcher.cancel()
+        self.pool.shutdown()
+
+    async def serve(self, unix_path: str = None, host: str = "127.0.0.1", port: int = 8765):
+        server = await self.start(unix_path, host, port)
+        print(f"Serving {sorted(_LEXERS)} on {unix_path or f'{host}:{port}'}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+
+async def _self_test():
+    import tempfile
+    from lexer import Lexer, save_lexer_to_json
+
+    with tempfile.TemporaryDirectory() as lexer_dir:
+        save_lexer_to_json(Lexer([("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("WS", " +")]), "demo.json", lexer_dir)
+        server = TokenizeServer(lexer_dir, workers=1, max_line_bytes=1024)
+        listener = await server.start(port=0)
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        requests = [
+            {"id": 1, "lexer": "demo", "text": "abc 42"},
+            {"id": 2, "text": 5},
+            {"id": 3, "lexer": ["demo"], "text": "x"},
+            {"id": 4, "lexer": "missing", "text": "x"},
+            {"id": 5, "lexer": "demo", "text": "x"},
+        ]
+        writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests) + b"[1]\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(len(requests) + 1)]
+        by_id = {response.get("id"): response for response in responses}
+
+        # a line over the limit gets an error and the next request on the connection is still served
+        writer.write(json.dumps({"id": 7, "lexer": "demo", "text": "ab " * 5000}).encode() + b"\n"
+                     + json.dumps({"id": 8, "lexer": "demo", "text": "y"}).encode() + b"\n")
+        await writer.drain()
+        oversized, after = [json.loads(await reader.readline()) for _ in range(2)]
+
+        writer.write(json.dumps({"id": 6, "stats": True}).encode() + b"\n")
+        await writer.drain()
+        stats = json.loads(await reader.readline())
+        writer.write_eof()
+        await reader.read()     # the server closes the connection once it has answered everything
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        server.close()
+
+    print(responses, oversized, after, stats, sep="\n")
+    assert by_id[1]["tokens"] == [["ID", 0, 3], ["WS", 3, 4], ["NUM", 4, 6]]
+    assert by_id[5]["tokens"] == [["ID", 0, 1]]
+    assert "must be strings" in by_id[2]["error"] and "must be strings" in by_id[3]["error"]
+    assert "Unknown lexer" in by_id[4]["error"]
+    assert "expected a JSON object" in by_id[None]["error"]
+    assert "exceeds the limit" in oversized["error"] and after == {"id": 8, "tokens": [["ID", 0, 1]]}
+    assert stats["id"] == 6 and stats["stats"]["requests"] == 4
+    print("All tests passed!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve compiled lexers over a local socket.")
+    parser.add_argument("lexer_dir", nargs="?", help="folder of <lexer>.json files written by save_lexer_to_json")
+    parser.add_argument("--unix", help="Unix socket path (default: localhost TCP)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--max-line-bytes", type=int, default=2 ** 24, help="longest request line accepted")
+    parser.add_argument("--self-test", action="store_true", help="serve a small lexer on a free port and check the replies")
+    args = parser.parse_args()
+
+    if args.self_test:
+        asyncio.run(_self_test())
+        raise SystemExit
+    if args.lexer_dir is None:
+        parser.error("lexer_dir is required")
+
+    server = TokenizeServer(args.lexer_dir, args.workers, args.max_batch, args.max_delay_ms / 1000, args.max_line_bytes)
+    try:
+        asyncio.run(server.serve(args.unix, port=args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,119 @@
+"""
+Plotting of the automata.
+
+networkx and pygraphviz are heavy to import, so the core modules (nfa, dfa, minimized_dfa, lexer, ...)
+never import this module at load time: their plot_* helpers import it on first use.
+"""
+import os
+
+
+def plot_fsm(transitions, start_state, accept_states, file_name, output_folder):
+    """
+    Visualize a finite state machine (FSM) as a graph and save it as an image.
+    :param transitions: A dictionary representing the FSM transitions.
+    :param start_state: The start state of the FSM.
+    :param accept_states: A set of accepting states.
+    :param file_name: The name of the output image file (e.g., "fsm.png").
+    :param output_folder: The folder where the image will be saved.
+    """
+    import networkx as nx
+    from networkx.drawing.nx_agraph import to_agraph
+
+    G = nx.MultiDiGraph()  # Use MultiDiGraph to allow multiple edges between nodes
+
+    # Add states (nodes)
+    for state, state_transitions in transitions.items():
+        # Add the state as a node
+        G.add_node(state, shape="doublecircle" if state in accept_states else "circle")
+
+        # Add transitions for the state
+        for symbol, next_states in state_transitions.items():
+            if isinstance(next_states, list):  # Handle NFA-style transitions
+                for next_state in next_states:
+                    G.add_edge(state, next_state, label=symbol)
+            else:  # Handle DFA-style transitions
+                G.add_edge(state, next_states, label=symbol)
+
+    # Add the start state
+    G.add_node("st", shape="none", label="")
+    G.add_edge("st", start_state)
+
+    # Convert to AGraph for styling and layout
+    A = to_agraph(G)
+    A.graph_attr.update(rankdir="LR")
+
+    # Ensure the output folder exists
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Save the graph as an image
+    graph_path = os.path.join(output_folder, file_name)
+    A.layout(prog="dot")
+    A.draw(graph_path)
+
+def plot_nfa(nfa, file_name, output_folder):
+    """
+    Visualize the NFA as a graph and save it as an image.
+    :param nfa: The NFA object to visualize.
+    :param output_folder: The folder where the image will be saved.
+    :param file_name: The name of the output image file (default is "nfa.png").
+    """
+    import networkx as nx
+    from networkx.drawing.nx_agraph import to_agraph
+
+    data = nfa.to_dict()
+    G = nx.DiGraph()
+
+    # Add states (nodes)
+    for state, transitions in data.items():
+        if state == "startingState":
+            continue
+        G.add_node(state, shape="doublecircle" if transitions["isTerminatingState"] else "circle")
+
+        for symbol, next_states in transitions.items():
+            if symbol == "isTerminatingState":
+                continue
+            for next_state in next_states:
+                G.add_edge(state, next_state, label=symbol)
+
+    # Convert to AGraph for styling and layout
+    A = to_agraph(G)
+
+    # Set the initial state
+    A.add_node("st", shape="none", label="")
+    A.add_edge("st", data["startingState"])
+
+    # Configure graph layout
+    A.graph_attr.update(rankdir="LR")
+
+    # Ensure the output folder exists
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Save the graph as an image
+    graph_path = os.path.join(output_folder, file_name)
+    A.layout(prog="dot")
+    A.draw(graph_path)
+
+def plot_dfa(dfa, file_name, output_folder):
+    """
+    Visualize the DFA as a graph and save it as an image using the common plot_fsm function.
+    """
+    plot_fsm(
+        transitions=dfa.transitions,
+        start_state=dfa.start_state,
+        accept_states=dfa.accept_states,
+        file_name=file_name,
+        output_folder=output_folder
+    )
+
+
+def plot_minimized_dfa(minimized_dfa, output_folder):
+    """
+    Visualize the minimized DFA as a graph and save it as an image.
+    """
+    plot_fsm(
+        transitions=minimized_dfa.minimized_transitions,
+        start_state=minimized_dfa.start_state,
+        accept_states=minimized_dfa.accept_states,
+        file_name="minimized_dfa.png",
+        output_folder=output_folder
+    )